@@ -20,6 +20,7 @@ class AudioClient {
         this.reconnectAttempts = 0;
         this.maxReconnectAttempts = 3;
         this.sessionId = null;
+        this.sessionHandle = null;
         this.userId = null;
 
         // Callbacks
@@ -35,10 +36,26 @@ class AudioClient {
         this.onToolCall = (name, args) => {};
         this.onStatusChange = (status) => {};
 
+        // AudioWorklet pipeline (see audio-worklets.js)
+        this.workletUrl = 'audio-worklets.js';
+        this.captureFrameSize = 512;  // Samples per uplink frame (32 ms at 16 kHz)
+        this.jitterBufferMs = 60;     // Audio buffered before playback starts
+        this.playbackContext = null;
+        this.playbackNode = null;
+        this._playbackReady = null;
+        this.playbackUnderruns = 0;
+
         // Audio playback
-        this.audioQueue = [];
         this.isPlaying = false;
-        this.currentSource = null;
+
+        // Outbound audio codec: Opus is requested in connect() only if WebCodecs can decode it
+        this.preferredAudioCodec = 'pcm';
+        this.audioCodec = 'pcm'; // Confirmed by the server in the 'connected' status
+        this.opusDecoder = null;
+        this.opusTimestamp = 0;
+
+        // Response mode: 'audio' for voice replies, 'text' for typed chat (no audio or transcriptions)
+        this.responseMode = 'audio';
 
         // Clean up any existing audioContexts
         if (window.existingAudioContexts) {
@@ -79,8 +96,11 @@ class AudioClient {
             this.sessionId = 'session-' + this.generateId();
         }
 
+        // Ask for Opus only when this browser's WebCodecs supports decoding it
+        this.preferredAudioCodec = await this._supportsOpus() ? 'opus' : 'pcm';
+
         // Build full WebSocket URL with path
-        this.serverUrl = `${this.serverBaseUrl}/ws/${this.userId}/${this.sessionId}`;
+        this.serverUrl = `${this.serverBaseUrl}/ws/${this.userId}/${this.sessionId}?audio_codec=${this.preferredAudioCodec}&mode=${this.responseMode}`;
         console.log('Connecting to:', this.serverUrl);
 
         // Reset reconnect attempts if this is a new connection
@@ -90,7 +110,8 @@ class AudioClient {
 
         return new Promise((resolve, reject) => {
             try {
-                this.ws = new WebSocket(this.serverUrl);
+                const ws = new WebSocket(this.serverUrl);
+                this.ws = ws;
 
                 const connectionTimeout = setTimeout(() => {
                     if (!this.isConnected) {
@@ -108,6 +129,9 @@ class AudioClient {
 
                 this.ws.onclose = (event) => {
                     console.log('WebSocket connection closed:', event.code, event.reason);
+                    if (ws !== this.ws) {
+                        return; // A newer connection replaced this one
+                    }
                     this.isConnected = false;
 
                     // Try to reconnect if it wasn't a normal closure
@@ -139,26 +163,32 @@ class AudioClient {
                             // Handle receiving audio data from server
                             const audioData = message.data;
                             this.onAudioReceived(audioData);
-                            await this.playAudio(audioData);
+                            await this.playAudio(audioData, message.codec || 'pcm');
                         }
                         else if (message.type === 'text') {
-                            // Handle receiving text from server
+                            // Reply chunk in text response mode
                             this.onTextReceived(message.data);
                         }
                         else if (message.type === 'turn_complete') {
                             // Model is done speaking
                             this.isModelSpeaking = false;
+                            this._endPlaybackTurn();
                             this.onTurnComplete();
                         }
                         else if (message.type === 'interrupted') {
-                            // Response was interrupted
-                            this.isModelSpeaking = false;
+                            // Response was interrupted: flush buffered audio instantly
+                            this.interrupt();
                             this.onInterrupted(message.data);
                         }
                         else if (message.type === 'error') {
                             // Handle server error
                             this.onError(message.data);
                         }
+                        else if (message.type === 'session_handle') {
+                            // Live API resumption handle; kept separate from the session ID
+                            // so reconnects still use /ws/{user_id}/{session_id}
+                            this.sessionHandle = message.data;
+                        }
                         else if (message.type === 'session_id') {
                             // Handle session ID
                             console.log('Received session ID message:', message);
@@ -169,6 +199,9 @@ class AudioClient {
                             // Handle connection status
                             console.log('Status:', message.status);
                             this.onStatusChange(message.status);
+                            if (message.audio_codec) {
+                                this.audioCodec = message.audio_codec;
+                            }
                             if (message.status === 'connected') {
                                 this.isConnected = true;
                                 this.onReady();
@@ -227,7 +260,7 @@ class AudioClient {
         }, backoffTime);
     }
     
-    // Initialize the audio context and recorder
+    // Initialize the audio context and AudioWorklet capture node
     async initializeAudio() {
         try {
             // Request microphone access
@@ -239,6 +272,7 @@ class AudioClient {
                 this.audioContext = new (window.AudioContext || window.webkitAudioContext)({
                     sampleRate: 16000 // Match the sample rate expected by server
                 });
+                await this.audioContext.audioWorklet.addModule(this.workletUrl);
 
                 // Track this context for cleanup
                 window.existingAudioContexts = window.existingAudioContexts || [];
@@ -247,44 +281,34 @@ class AudioClient {
 
             // Create MediaStreamSource
             const source = this.audioContext.createMediaStreamSource(stream);
-            
-            // Create ScriptProcessor for audio processing
-            const processor = this.audioContext.createScriptProcessor(4096, 1, 1);
-            
-            processor.onaudioprocess = (e) => {
-                if (!this.isRecording) return;
-                
-                // Get audio data
-                const inputData = e.inputBuffer.getChannelData(0);
-                
-                // Convert float32 to int16
-                const int16Data = new Int16Array(inputData.length);
-                for (let i = 0; i < inputData.length; i++) {
-                    int16Data[i] = Math.max(-32768, Math.min(32767, Math.floor(inputData[i] * 32768)));
-                }
-                
+
+            // Capture runs on the audio thread and posts Int16 frames as transferables
+            const processor = new AudioWorkletNode(this.audioContext, 'capture-processor', {
+                numberOfInputs: 1,
+                numberOfOutputs: 0,
+                channelCount: 1,
+                processorOptions: { frameSize: this.captureFrameSize }
+            });
+
+            processor.port.onmessage = (e) => {
                 // Send to server if connected
                 if (this.isConnected && this.isRecording) {
-                    const audioBuffer = new Uint8Array(int16Data.buffer);
-                    const base64Audio = this._arrayBufferToBase64(audioBuffer);
-                    
                     this.ws.send(JSON.stringify({
                         type: 'audio',
-                        data: base64Audio
+                        data: this._arrayBufferToBase64(e.data)
                     }));
                 }
             };
-            
+
             // Connect the audio nodes
             source.connect(processor);
-            processor.connect(this.audioContext.destination);
-            
+
             this.recorder = {
                 source: source,
                 processor: processor,
                 stream: stream
             };
-            
+
             return true;
         } catch (error) {
             console.error('Error initializing audio:', error);
@@ -292,7 +316,38 @@ class AudioClient {
             return false;
         }
     }
-    
+
+    // Create the 24 kHz playback context and jitter-buffered AudioWorklet node
+    async _initializePlayback() {
+        if (this.playbackNode && this.playbackContext && this.playbackContext.state !== 'closed') {
+            return;
+        }
+
+        this.playbackContext = new (window.AudioContext || window.webkitAudioContext)({
+            sampleRate: 24000 // Match the sample rate received from server
+        });
+        window.existingAudioContexts.push(this.playbackContext);
+        await this.playbackContext.audioWorklet.addModule(this.workletUrl);
+
+        this.playbackNode = new AudioWorkletNode(this.playbackContext, 'playback-processor', {
+            numberOfInputs: 0,
+            numberOfOutputs: 1,
+            outputChannelCount: [1],
+            processorOptions: {
+                jitterBufferSamples: Math.round(24000 * this.jitterBufferMs / 1000)
+            }
+        });
+        this.playbackNode.port.onmessage = (e) => {
+            if (e.data.type === 'started') {
+                this.isPlaying = true;
+            } else if (e.data.type === 'drained') {
+                this.isPlaying = false;
+                this.playbackUnderruns = e.data.underruns;
+            }
+        };
+        this.playbackNode.connect(this.playbackContext.destination);
+    }
+
     // Start recording audio
     async startRecording() {
         if (!this.recorder) {
@@ -325,6 +380,39 @@ class AudioClient {
         }
     }
 
+    // Switch between voice ('audio') and text replies; reconnects on the same session
+    async setResponseMode(mode) {
+        if (mode === this.responseMode) {
+            return;
+        }
+        this.responseMode = mode;
+        this.interrupt();
+        if (this.ws) {
+            this.ws.close(1000);
+        }
+        this.isConnected = false;
+        await this.connect();
+    }
+
+    // Send a typed message to the agent
+    sendText(text) {
+        if (!this.isConnected || !this.ws || this.ws.readyState !== WebSocket.OPEN) {
+            console.warn('Cannot send text: not connected');
+            return false;
+        }
+
+        try {
+            this.ws.send(JSON.stringify({
+                type: 'text',
+                data: text
+            }));
+            return true;
+        } catch (error) {
+            console.error('Error sending text:', error);
+            return false;
+        }
+    }
+
     // Send video frame to server
     sendVideo(base64Data) {
         if (!this.isConnected || !this.ws || this.ws.readyState !== WebSocket.OPEN) {
@@ -346,142 +434,139 @@ class AudioClient {
     }
     
     // Decode and play received audio
-    async playAudio(base64Audio) {
+    async playAudio(base64Audio, codec = 'pcm') {
         try {
             // Decode the base64 audio data
             const audioData = this._base64ToArrayBuffer(base64Audio);
 
-            // Create an audio context if needed
-            if (!this.audioContext || this.audioContext.state === 'closed') {
-                this.audioContext = new (window.AudioContext || window.webkitAudioContext)({
-                    sampleRate: 24000 // Match the sample rate received from server
-                });
-
-                // Track this context for cleanup
-                window.existingAudioContexts.push(this.audioContext);
-
-                // Limit the number of contexts we track to avoid memory issues
-                if (window.existingAudioContexts.length > 5) {
-                    const oldContext = window.existingAudioContexts.shift();
-                    try {
-                        if (oldContext && oldContext !== this.audioContext && oldContext.state !== 'closed') {
-                            oldContext.close();
-                        }
-                    } catch (e) {
-                        console.error("Error closing old audio context:", e);
-                    }
-                }
+            // Create the playback pipeline if needed
+            if (!this._playbackReady) {
+                this._playbackReady = this._initializePlayback();
             }
+            await this._playbackReady;
 
             // Resume audio context if suspended
-            if (this.audioContext.state === 'suspended') {
-                await this.audioContext.resume();
+            if (this.playbackContext.state === 'suspended') {
+                await this.playbackContext.resume();
             }
 
-            // Add to audio queue
-            this.audioQueue.push(audioData);
-
-            // If not currently playing, start playback
-            if (!this.isPlaying) {
-                this.playNextInQueue();
+            if (codec === 'opus') {
+                // Decoded frames are queued asynchronously by the decoder output callback
+                this._decodeOpus(audioData);
+            } else {
+                // Int16 -> Float32 conversion happens on the audio thread
+                this.playbackNode.port.postMessage({ type: 'pcm16', buffer: audioData }, [audioData]);
             }
 
             // Set flag to indicate model is speaking
             this.isModelSpeaking = true;
         } catch (error) {
             console.error('Error playing audio:', error);
+            this._playbackReady = null;
         }
     }
 
-    // Play next audio chunk from queue
-    playNextInQueue() {
-        if (this.audioQueue.length === 0) {
-            this.isPlaying = false;
-            return;
+    // Whether WebCodecs can decode the server's Opus stream (24 kHz mono)
+    async _supportsOpus() {
+        if (typeof AudioDecoder === 'undefined' || !AudioDecoder.isConfigSupported) {
+            return false;
         }
-
-        this.isPlaying = true;
-
         try {
-            // Stop any previous source if still active
-            if (this.currentSource) {
-                try {
-                    this.currentSource.onended = null; // Remove event listener
-                    this.currentSource.stop();
-                    this.currentSource.disconnect();
-                } catch (e) {
-                    // Ignore errors if already stopped
-                }
-                this.currentSource = null;
-            }
-
-            // Get next audio data from queue
-            const audioData = this.audioQueue.shift();
-
-            // Convert Int16Array to Float32Array for AudioBuffer
-            const int16Array = new Int16Array(audioData);
-            const float32Array = new Float32Array(int16Array.length);
-            for (let i = 0; i < int16Array.length; i++) {
-                float32Array[i] = int16Array[i] / 32768.0;
-            }
-
-            // Create an AudioBuffer
-            const audioBuffer = this.audioContext.createBuffer(1, float32Array.length, 24000);
-            audioBuffer.getChannelData(0).set(float32Array);
-
-            // Create a source node
-            const source = this.audioContext.createBufferSource();
-            source.buffer = audioBuffer;
+            const { supported } = await AudioDecoder.isConfigSupported({
+                codec: 'opus', sampleRate: 24000, numberOfChannels: 1
+            });
+            return supported;
+        } catch (e) {
+            return false;
+        }
+    }
 
-            // Store reference to current source
-            this.currentSource = source;
+    // Linear resampling of a mono Float32 chunk (decoders may output 48 kHz regardless of config)
+    _resample(samples, fromRate, toRate) {
+        if (fromRate === toRate) {
+            return samples;
+        }
+        const ratio = fromRate / toRate;
+        const resampled = new Float32Array(Math.floor(samples.length / ratio));
+        for (let i = 0; i < resampled.length; i++) {
+            const position = i * ratio;
+            const index = Math.floor(position);
+            const next = Math.min(index + 1, samples.length - 1);
+            const fraction = position - index;
+            resampled[i] = samples[index] * (1 - fraction) + samples[next] * fraction;
+        }
+        return resampled;
+    }
 
-            // Connect to destination
-            source.connect(this.audioContext.destination);
+    // Decode a payload of length-prefixed Opus packets (u16 little endian length + packet)
+    _decodeOpus(buffer) {
+        if (!this.opusDecoder || this.opusDecoder.state === 'closed') {
+            this.opusDecoder = new AudioDecoder({
+                output: (audioData) => {
+                    const decoded = new Float32Array(audioData.numberOfFrames);
+                    audioData.copyTo(decoded, { planeIndex: 0, format: 'f32-planar' });
+                    const sampleRate = audioData.sampleRate;
+                    audioData.close();
+                    // Match the playback context rate, or speech plays at the wrong speed
+                    const samples = this._resample(decoded, sampleRate, this.playbackContext.sampleRate);
+                    this.playbackNode.port.postMessage({ type: 'f32', buffer: samples.buffer }, [samples.buffer]);
+                },
+                error: (e) => console.error('Opus decode error:', e)
+            });
+            this.opusDecoder.configure({ codec: 'opus', sampleRate: 24000, numberOfChannels: 1 });
+            this.opusTimestamp = 0;
+        }
 
-            // When this buffer ends, play the next one
-            source.onended = () => {
-                this.currentSource = null;
-                this.playNextInQueue();
-            };
+        const view = new DataView(buffer);
+        let offset = 0;
+        while (offset + 2 <= buffer.byteLength) {
+            const length = view.getUint16(offset, true);
+            offset += 2;
+            this.opusDecoder.decode(new EncodedAudioChunk({
+                type: 'key',
+                timestamp: this.opusTimestamp,
+                data: new Uint8Array(buffer, offset, length)
+            }));
+            offset += length;
+            this.opusTimestamp += 20000; // 20 ms frames, in microseconds
+        }
+    }
 
-            // Start playing
-            source.start(0);
-        } catch (error) {
-            console.error('Error during audio playback:', error);
-            this.currentSource = null;
-            // Try next buffer on error
-            setTimeout(() => this.playNextInQueue(), 100);
+    // Let the jitter buffer play out whatever is left of the current turn
+    _endPlaybackTurn() {
+        if (this.playbackNode) {
+            this.playbackNode.port.postMessage({ type: 'end' });
         }
     }
-    
+
     // Interrupt current playback
     interrupt() {
         this.isModelSpeaking = false;
 
-        // Stop current audio source if active
-        if (this.currentSource) {
+        // Flush the jitter buffer on the audio thread immediately
+        if (this.playbackNode) {
+            this.playbackNode.port.postMessage({ type: 'flush' });
+        }
+        this.isPlaying = false;
+
+        // Drop any Opus frames still being decoded
+        if (this.opusDecoder && this.opusDecoder.state !== 'closed') {
             try {
-                this.currentSource.onended = null; // Remove event listener
-                this.currentSource.stop();
-                this.currentSource.disconnect();
+                this.opusDecoder.close();
             } catch (e) {
-                // Ignore errors if already stopped
+                // Ignore errors if already closed
             }
-            this.currentSource = null;
         }
-
-        // Clear queue and reset playing state
-        this.audioQueue = [];
-        this.isPlaying = false;
+        this.opusDecoder = null;
     }
-    
+
     // Cleanup resources
     close() {
         this.stopRecording();
 
         // Reset session ID
         this.sessionId = null;
+        this.sessionHandle = null;
 
         // Stop any audio playback
         this.interrupt();
@@ -499,14 +584,19 @@ class AudioClient {
             }
         }
 
-        // Close audio context
-        if (this.audioContext && this.audioContext.state !== 'closed') {
-            try {
-                this.audioContext.close().catch(e => console.error("Error closing audio context:", e));
-            } catch (e) {
-                console.error("Error closing audio context:", e);
+        // Close audio contexts
+        [this.audioContext, this.playbackContext].forEach(ctx => {
+            if (ctx && ctx.state !== 'closed') {
+                try {
+                    ctx.close().catch(e => console.error("Error closing audio context:", e));
+                } catch (e) {
+                    console.error("Error closing audio context:", e);
+                }
             }
-        }
+        });
+        this.playbackContext = null;
+        this.playbackNode = null;
+        this._playbackReady = null;
 
         // Close WebSocket
         if (this.ws) {
@@ -527,9 +617,9 @@ class AudioClient {
     _arrayBufferToBase64(buffer) {
         let binary = '';
         const bytes = new Uint8Array(buffer);
-        const len = bytes.byteLength;
-        for (let i = 0; i < len; i++) {
-            binary += String.fromCharCode(bytes[i]);
+        const chunkSize = 0x8000; // Stay below argument-count limits of fromCharCode
+        for (let i = 0; i < bytes.byteLength; i += chunkSize) {
+            binary += String.fromCharCode.apply(null, bytes.subarray(i, i + chunkSize));
         }
         return btoa(binary);
     }
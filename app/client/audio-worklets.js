@@ -0,0 +1,154 @@
+/**
+ * AudioWorklet processors for low-latency capture and playback
+ * Tata Neu Customer Care Assistant
+ *
+ * Loaded with audioContext.audioWorklet.addModule('audio-worklets.js').
+ * Both processors run on the audio rendering thread, so sample conversion and
+ * buffering never block the main thread. Buffers are exchanged with the main
+ * thread as transferables (no copies).
+ */
+
+/**
+ * Captures microphone audio as 16-bit PCM frames.
+ *
+ * processorOptions.frameSize: samples per frame posted to the main thread
+ * (e.g. 512 samples = 32 ms at 16 kHz). Smaller frames lower capture latency
+ * at the cost of more WebSocket messages.
+ */
+class CaptureProcessor extends AudioWorkletProcessor {
+    constructor(options) {
+        super();
+        this.frameSize = (options.processorOptions && options.processorOptions.frameSize) || 1024;
+        this.frame = new Int16Array(this.frameSize);
+        this.offset = 0;
+    }
+
+    process(inputs) {
+        const input = inputs[0];
+        if (!input || input.length === 0) {
+            return true;
+        }
+
+        const channel = input[0];
+        for (let i = 0; i < channel.length; i++) {
+            const sample = Math.max(-1, Math.min(1, channel[i]));
+            this.frame[this.offset++] = sample < 0 ? sample * 32768 : sample * 32767;
+
+            if (this.offset === this.frameSize) {
+                // Hand the buffer over to the main thread and start a fresh one
+                this.port.postMessage(this.frame.buffer, [this.frame.buffer]);
+                this.frame = new Int16Array(this.frameSize);
+                this.offset = 0;
+            }
+        }
+        return true;
+    }
+}
+
+/**
+ * Plays model audio through a jitter buffer.
+ *
+ * Playback starts once processorOptions.jitterBufferSamples are buffered and
+ * re-buffers after an underrun, which smooths out bursty network delivery.
+ *
+ * Messages from the main thread:
+ * - {type: 'pcm16', buffer: ArrayBuffer}  16-bit PCM, transferred
+ * - {type: 'f32', buffer: ArrayBuffer}    Float32 samples, transferred
+ * - {type: 'end'}                         end of turn: play out the remainder
+ * - {type: 'flush'}                       drop everything buffered (interruption)
+ *
+ * Messages to the main thread:
+ * - {type: 'started'}                    playback began after pre-buffering
+ * - {type: 'drained', underruns: n}      buffer ran empty (n counts mid-turn underruns)
+ */
+class PlaybackProcessor extends AudioWorkletProcessor {
+    constructor(options) {
+        super();
+        this.jitterBufferSamples = (options.processorOptions && options.processorOptions.jitterBufferSamples) || 1440;
+        this.chunks = [];
+        this.chunkOffset = 0;
+        this.bufferedSamples = 0;
+        this.playing = false;
+        this.endOfTurn = false;
+        this.underruns = 0;
+
+        this.port.onmessage = (event) => {
+            const message = event.data;
+            if (message.type === 'flush') {
+                this.chunks = [];
+                this.chunkOffset = 0;
+                this.bufferedSamples = 0;
+                this.playing = false;
+                this.endOfTurn = false;
+                return;
+            }
+            if (message.type === 'end') {
+                // Nothing left to play out if the buffer already ran dry
+                this.endOfTurn = this.bufferedSamples > 0;
+                return;
+            }
+
+            let samples;
+            if (message.type === 'pcm16') {
+                const int16 = new Int16Array(message.buffer);
+                samples = new Float32Array(int16.length);
+                for (let i = 0; i < int16.length; i++) {
+                    samples[i] = int16[i] / 32768.0;
+                }
+            } else {
+                samples = new Float32Array(message.buffer);
+            }
+            if (this.bufferedSamples === 0 && !this.playing) {
+                // First chunk of a new turn: pre-buffer again even if the last turn's 'end' came late
+                this.endOfTurn = false;
+            }
+            this.chunks.push(samples);
+            this.bufferedSamples += samples.length;
+        };
+    }
+
+    process(inputs, outputs) {
+        const output = outputs[0][0];
+
+        if (!this.playing) {
+            const ready = this.bufferedSamples >= this.jitterBufferSamples
+                || (this.endOfTurn && this.bufferedSamples > 0);
+            if (!ready) {
+                output.fill(0);
+                return true;
+            }
+            this.playing = true;
+            this.port.postMessage({ type: 'started' });
+        }
+
+        let written = 0;
+        while (written < output.length && this.chunks.length > 0) {
+            const chunk = this.chunks[0];
+            const count = Math.min(output.length - written, chunk.length - this.chunkOffset);
+            output.set(chunk.subarray(this.chunkOffset, this.chunkOffset + count), written);
+            written += count;
+            this.chunkOffset += count;
+            this.bufferedSamples -= count;
+
+            if (this.chunkOffset === chunk.length) {
+                this.chunks.shift();
+                this.chunkOffset = 0;
+            }
+        }
+
+        if (written < output.length) {
+            // Buffer ran empty: pad with silence and pre-buffer again before resuming
+            output.fill(0, written);
+            this.playing = false;
+            if (!this.endOfTurn) {
+                this.underruns++;
+            }
+            this.endOfTurn = false;
+            this.port.postMessage({ type: 'drained', underruns: this.underruns });
+        }
+        return true;
+    }
+}
+
+registerProcessor('capture-processor', CaptureProcessor);
+registerProcessor('playback-processor', PlaybackProcessor);
@@ -0,0 +1,148 @@
+"""Outbound audio encoding for Tata Neu Customer Care Assistant.
+
+Gemini returns 24 kHz 16-bit mono PCM (~48 KB/s, ~64 KB/s once base64 encoded).
+Clients on weak networks can negotiate Opus instead, which is encoded here in a
+shared worker pool. Opus support is optional: without the opuslib package (and
+the system libopus) every connection falls back to raw PCM.
+
+Opus payload framing (before base64): repeated u16 little endian packet length
+followed by one 20 ms Opus packet.
+"""
+
+import asyncio
+import base64
+import logging
+import os
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+try:
+    import opuslib
+except (ImportError, OSError):  # OSError when libopus itself is missing
+    opuslib = None
+
+logger = logging.getLogger(__name__)
+
+PCM_CODEC = "pcm"
+OPUS_CODEC = "opus"
+
+OPUS_FRAME_MS = 20
+OPUS_BITRATE = int(os.getenv("OPUS_BITRATE", "24000"))
+AUDIO_ENCODE_WORKERS = int(os.getenv("AUDIO_ENCODE_WORKERS", "4"))
+
+_PACKET_LENGTH = struct.Struct("<H")
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def supported_codecs() -> list:
+    """Codecs this server instance can produce."""
+    return [PCM_CODEC, OPUS_CODEC] if opuslib is not None else [PCM_CODEC]
+
+
+def negotiate_codec(requested: Optional[str]) -> str:
+    """Pick the output codec for a connection, falling back to PCM."""
+    requested = (requested or PCM_CODEC).lower()
+    if requested in supported_codecs():
+        return requested
+    if requested != PCM_CODEC:
+        logger.warning(f"Audio codec '{requested}' not available, falling back to PCM")
+    return PCM_CODEC
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Shared encode pool; libopus releases the GIL while encoding."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=AUDIO_ENCODE_WORKERS, thread_name_prefix="audio-encode")
+    return _executor
+
+
+class OutboundAudioEncoder:
+    """Per-connection encoder turning model PCM chunks into WebSocket payloads.
+
+    Opus needs fixed 20 ms frames, so any remainder of a chunk is carried over to
+    the next one and padded with silence at the end of a turn.
+    """
+
+    def __init__(self, codec: str = PCM_CODEC, sample_rate: int = 24000):
+        self.codec = codec
+        self.sample_rate = sample_rate
+
+        # Per-session accounting
+        self.pcm_bytes = 0
+        self.wire_bytes = 0
+        self.chunks = 0
+        self.encode_cpu_seconds = 0.0
+
+        self._pending = b""
+        self._encoder = None
+        self._frame_samples = sample_rate * OPUS_FRAME_MS // 1000
+        self._frame_bytes = self._frame_samples * 2
+        if codec == OPUS_CODEC:
+            self._encoder = opuslib.Encoder(sample_rate, 1, opuslib.APPLICATION_VOIP)
+            self._encoder.bitrate = OPUS_BITRATE
+
+    def _encode_frames(self, pcm: bytes) -> tuple:
+        """Encode whole frames (runs in the worker pool)."""
+        cpu_start = time.thread_time()
+        packets = []
+        for offset in range(0, len(pcm), self._frame_bytes):
+            packet = self._encoder.encode(pcm[offset:offset + self._frame_bytes], self._frame_samples)
+            packets.append(_PACKET_LENGTH.pack(len(packet)))
+            packets.append(packet)
+        return b"".join(packets), time.thread_time() - cpu_start
+
+    async def encode(self, pcm: bytes, flush: bool = False) -> Optional[str]:
+        """
+        Encode a PCM chunk for the client.
+
+        Args:
+            pcm: 16-bit mono PCM from the model (may be empty when flushing)
+            flush: Pad and emit any buffered remainder (end of turn)
+
+        Returns:
+            Base64 payload for an "audio" message, or None if nothing is ready yet
+        """
+        self.pcm_bytes += len(pcm)
+
+        if self._encoder is None:
+            if not pcm:
+                return None
+            payload = base64.b64encode(pcm).decode("utf-8")
+        else:
+            data = self._pending + pcm
+            if flush and len(data) % self._frame_bytes:
+                data += b"\x00" * (self._frame_bytes - len(data) % self._frame_bytes)
+            usable = len(data) - len(data) % self._frame_bytes
+            self._pending = data[usable:]
+            if not usable:
+                return None
+
+            loop = asyncio.get_running_loop()
+            encoded, cpu_seconds = await loop.run_in_executor(
+                _get_executor(), self._encode_frames, data[:usable]
+            )
+            self.encode_cpu_seconds += cpu_seconds
+            payload = base64.b64encode(encoded).decode("utf-8")
+
+        self.chunks += 1
+        self.wire_bytes += len(payload)
+        return payload
+
+    def discard_pending(self) -> None:
+        """Drop buffered audio, e.g. when the response was interrupted."""
+        self._pending = b""
+
+    def summary(self, duration_seconds: float) -> dict:
+        """Bandwidth and CPU usage for this connection."""
+        duration_seconds = max(duration_seconds, 1e-6)
+        return {
+            "codec": self.codec,
+            "pcm_bytes": self.pcm_bytes,
+            "wire_bytes": self.wire_bytes,
+            "wire_kbps": round(self.wire_bytes * 8 / 1000 / duration_seconds, 1),
+            "compression_ratio": round(self.pcm_bytes / self.wire_bytes, 2) if self.wire_bytes else None,
+            "encode_cpu_ms": round(self.encode_cpu_seconds * 1000, 1),
+        }
@@ -0,0 +1,237 @@
+"""Pool of pre-opened live model connections.
+
+Opening a run_live() stream includes the model connection handshake, which a new
+caller would otherwise wait for before hearing anything. The pool keeps a few
+streams already open on placeholder sessions and hands one to each new caller.
+The caller's (user_id, session_id) is then aliased to the pooled ADK session, so
+reconnects resume the same history.
+
+The target size follows the recent arrival rate. Entries are only handed out
+while most of the Live API connection lifetime (~10 minutes) is still ahead of
+the caller, and are recycled after that.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Set, Tuple
+
+from google.adk.agents.run_config import RunConfig
+from google.adk.runners import Runner
+
+from live_stream import LiveStream
+from tat_neu.usage import SessionUsage
+
+logger = logging.getLogger(__name__)
+
+LIVE_POOL_MIN_SIZE = int(os.getenv("LIVE_POOL_MIN_SIZE", "0"))
+LIVE_POOL_MAX_SIZE = int(os.getenv("LIVE_POOL_MAX_SIZE", "0"))  # 0 disables the pool
+# Connections idle longer than this are recycled instead of handed out, so a caller
+# gets at least (connection lifetime - this) before the Live API closes the stream
+LIVE_POOL_MAX_IDLE_SECONDS = float(os.getenv("LIVE_POOL_MAX_IDLE_SECONDS", "60"))
+# Caller aliases unused for this long are forgotten
+LIVE_POOL_ALIAS_TTL_SECONDS = float(os.getenv("LIVE_POOL_ALIAS_TTL_SECONDS", "3600"))
+# How long the pool must cover arrivals on its own while it refills
+LIVE_POOL_REFILL_SECONDS = float(os.getenv("LIVE_POOL_REFILL_SECONDS", "10"))
+# Window over which the arrival rate is measured
+LIVE_POOL_RATE_WINDOW_SECONDS = float(os.getenv("LIVE_POOL_RATE_WINDOW_SECONDS", "300"))
+
+
+class PooledLiveConnection(LiveStream):
+    """A run_live() stream opened ahead of time on a placeholder session."""
+
+    def __init__(self, runner: Runner, user_id: str, session_id: str, run_config: RunConfig):
+        # Usage is re-labelled with the caller's IDs when the connection is handed out
+        self.usage = SessionUsage(user_id, session_id)
+        self.opened_at = time.monotonic()
+        super().__init__(runner, user_id, session_id, run_config, usage=self.usage)
+
+    def age(self) -> float:
+        return time.monotonic() - self.opened_at
+
+
+class LiveSessionPool:
+    """Instance-level pool of warm live connections."""
+
+    def __init__(
+        self,
+        runner: Runner,
+        app_name: str,
+        run_config_factory: Callable[[], RunConfig],
+        min_size: int = LIVE_POOL_MIN_SIZE,
+        max_size: int = LIVE_POOL_MAX_SIZE,
+    ):
+        self.runner = runner
+        self.app_name = app_name
+        self.run_config_factory = run_config_factory
+        self.min_size = min_size
+        self.max_size = max_size
+
+        self._idle: Deque[PooledLiveConnection] = deque()
+        self._opening = 0
+        self._arrivals: Deque[float] = deque()
+        # (user_id, session_id) -> (ADK user_id, ADK session_id, last used)
+        self._aliases: Dict[Tuple[str, str], Tuple[str, str, float]] = {}
+        self._maintainer: Optional[asyncio.Task] = None
+        self._discarding: Set[asyncio.Task] = set()
+        self._wakeup = asyncio.Event()
+
+        # Reporting
+        self.hits = 0
+        self.misses = 0
+        self.recycled = 0
+        self._first_audio_ms: Dict[bool, Deque[float]] = {True: deque(maxlen=500), False: deque(maxlen=500)}
+
+    # ---- Caller side ----
+
+    def resolve(self, user_id: str, session_id: str) -> Tuple[str, str]:
+        """ADK (user_id, session_id) to use for a caller, following pool aliases."""
+        alias = self._aliases.get((user_id, session_id))
+        if alias is None:
+            return user_id, session_id
+        self._aliases[(user_id, session_id)] = (alias[0], alias[1], time.monotonic())
+        return alias[0], alias[1]
+
+    def release(self, user_id: str, session_id: str) -> None:
+        """Mark the end of a caller's connection; the alias expires LIVE_POOL_ALIAS_TTL_SECONDS later."""
+        self.resolve(user_id, session_id)
+
+    def acquire(self, user_id: str, session_id: str) -> Optional[PooledLiveConnection]:
+        """
+        Hand a warm connection to a new caller.
+
+        Args:
+            user_id: Caller's user ID from the WebSocket path
+            session_id: Caller's session ID from the WebSocket path
+
+        Returns:
+            A pooled connection aliased to the caller, or None on a pool miss
+        """
+        self._arrivals.append(time.monotonic())
+        self._wakeup.set()
+
+        while self._idle:
+            connection = self._idle.popleft()
+            if connection.alive and connection.age() < LIVE_POOL_MAX_IDLE_SECONDS:
+                self.hits += 1
+                self._aliases[(user_id, session_id)] = (connection.user_id, connection.session_id, time.monotonic())
+                connection.usage.user_id = user_id
+                connection.usage.session_id = session_id
+                connection.usage.started_at = time.time()
+                logger.info(f"🔥 Live pool hit: {user_id}/{session_id} -> {connection.session_id}")
+                return connection
+            task = asyncio.create_task(self._discard(connection))
+            self._discarding.add(task)
+            task.add_done_callback(self._discarding.discard)
+
+        self.misses += 1
+        logger.info(f"🧊 Live pool miss: {user_id}/{session_id}")
+        return None
+
+    def record_first_audio(self, latency_ms: float, pool_hit: bool) -> None:
+        """Record connect-to-first-audio latency of a session."""
+        self._first_audio_ms[pool_hit].append(latency_ms)
+
+    # ---- Pool maintenance ----
+
+    def target_size(self) -> int:
+        """Warm connections to keep, from the recent arrival rate."""
+        now = time.monotonic()
+        while self._arrivals and now - self._arrivals[0] > LIVE_POOL_RATE_WINDOW_SECONDS:
+            self._arrivals.popleft()
+        rate = len(self._arrivals) / LIVE_POOL_RATE_WINDOW_SECONDS
+        target = math.ceil(rate * LIVE_POOL_REFILL_SECONDS)
+        return max(self.min_size, min(self.max_size, target))
+
+    async def _open(self) -> None:
+        self._opening += 1
+        try:
+            user_id = f"pool-user-{uuid.uuid4().hex[:8]}"
+            session_id = f"pool-{uuid.uuid4().hex[:12]}"
+            await self.runner.session_service.create_session(
+                app_name=self.app_name, user_id=user_id, session_id=session_id
+            )
+            self._idle.append(PooledLiveConnection(self.runner, user_id, session_id, self.run_config_factory()))
+        except Exception as e:
+            logger.error(f"Error opening pooled live connection: {e}")
+        finally:
+            self._opening -= 1
+
+    async def _discard(self, connection: PooledLiveConnection) -> None:
+        await connection.close()
+        try:
+            await self.runner.session_service.delete_session(
+                app_name=self.app_name, user_id=connection.user_id, session_id=connection.session_id
+            )
+        except Exception as e:
+            logger.warning(f"Error deleting pooled session {connection.session_id}: {e}")
+
+    async def _maintain(self) -> None:
+        while True:
+            try:
+                # Recycle connections before the Live API closes them
+                for connection in list(self._idle):
+                    # acquire() may have taken it while an earlier discard was awaited
+                    if connection not in self._idle:
+                        continue
+                    if not connection.alive or connection.age() >= LIVE_POOL_MAX_IDLE_SECONDS:
+                        self._idle.remove(connection)
+                        self.recycled += 1
+                        await self._discard(connection)
+
+                # Forget aliases of callers that have not reconnected for a while
+                now = time.monotonic()
+                for key, alias in list(self._aliases.items()):
+                    if now - alias[2] > LIVE_POOL_ALIAS_TTL_SECONDS:
+                        del self._aliases[key]
+
+                # Shrink or grow towards the target
+                target = self.target_size()
+                while len(self._idle) > target:
+                    await self._discard(self._idle.pop())
+                for _ in range(target - len(self._idle) - self._opening):
+                    await self._open()
+            except Exception as e:
+                logger.error(f"Live pool maintenance error: {e}")
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self) -> None:
+        if self._maintainer is None:
+            self._maintainer = asyncio.create_task(self._maintain())
+            logger.info(f"🔥 Live pool started (min={self.min_size}, max={self.max_size})")
+
+    async def stop(self) -> None:
+        if self._maintainer is not None:
+            self._maintainer.cancel()
+            self._maintainer = None
+        while self._idle:
+            await self._discard(self._idle.pop())
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size, hit rate and connect-to-first-audio latency."""
+        lookups = self.hits + self.misses
+
+        def _avg(values: Deque[float]) -> Optional[float]:
+            return round(sum(values) / len(values), 1) if values else None
+
+        return {
+            "idle": len(self._idle),
+            "opening": self._opening,
+            "target_size": self.target_size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "recycled": self.recycled,
+            "aliases": len(self._aliases),
+            "avg_first_audio_ms_hit": _avg(self._first_audio_ms[True]),
+            "avg_first_audio_ms_miss": _avg(self._first_audio_ms[False]),
+        }
@@ -0,0 +1,603 @@
+"""One bidirectional streaming session between a client WebSocket and ADK.
+
+run_live_session() is the per-connection pipeline behind the /ws endpoints in
+main.py: upstream (client audio, video and text into the LiveRequestQueue),
+downstream (run_live() events back to the client), idle parking and usage
+accounting. It does not import the agent stack, so session_replay.py can run it
+offline with a recorded runner.
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import time
+from array import array
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from google.adk.agents.live_request_queue import LiveRequestQueue
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.runners import Runner
+from google.genai import types
+
+from tat_neu.usage import SessionUsage, current_usage
+from tat_neu.sub_agents.customer_context import (
+    find_customer_identifiers,
+    prefetch_customer_context,
+)
+from session_recorder import SessionRecorder
+from audio_codec import OutboundAudioEncoder
+from usage_store import save_session_usage
+from live_pool import LiveSessionPool, PooledLiveConnection
+from live_stream import LiveStream
+
+logger = logging.getLogger(__name__)
+
+# Session constants
+VOICE_NAME = os.getenv("VOICE_NAME", "Leda")
+SEND_SAMPLE_RATE = 16000  # Rate of audio sent to Gemini
+RECEIVE_SAMPLE_RATE = 24000  # Rate of audio received from Gemini
+# Warm the customer context cache as soon as an identifier is heard
+SPECULATIVE_PREFETCH = os.getenv("SPECULATIVE_PREFETCH", "false").lower() == "true"
+# Close the model stream after this many seconds without voice or turns (0 disables)
+IDLE_PARK_SECONDS = float(os.getenv("IDLE_PARK_SECONDS", "0"))
+# RMS level (16-bit PCM) above which incoming audio counts as voice
+VOICE_RMS_THRESHOLD = float(os.getenv("VOICE_RMS_THRESHOLD", "500"))
+
+# Resource usage of sessions currently connected to this instance
+active_sessions: Dict[str, SessionUsage] = {}
+# Sessions whose model stream is closed while the caller is idle
+parked_sessions: Set[str] = set()
+
+
+def is_voiced(pcm: bytes) -> bool:
+    """Rough voice activity check on 16-bit PCM (RMS over every 4th sample)."""
+    samples = array("h")
+    samples.frombytes(pcm[: len(pcm) - len(pcm) % 2])
+    sampled = samples[::4]
+    if not sampled:
+        return False
+    rms = (sum(s * s for s in sampled) / len(sampled)) ** 0.5
+    return rms >= VOICE_RMS_THRESHOLD
+
+
+def build_run_config(resumable: bool = IDLE_PARK_SECONDS > 0) -> RunConfig:
+    """RunConfig for a voice session; resumable sessions get resumption handles (for parking)."""
+    # Native audio models require AUDIO response modality
+    # Note: Automatic VAD (Voice Activity Detection) is enabled by default
+    return RunConfig(
+        streaming_mode=StreamingMode.BIDI,
+        speech_config=types.SpeechConfig(
+            voice_config=types.VoiceConfig(
+                prebuilt_voice_config=types.PrebuiltVoiceConfig(
+                    voice_name=VOICE_NAME
+                )
+            ),
+        ),
+        response_modalities=["AUDIO"],
+        output_audio_transcription=types.AudioTranscriptionConfig(),
+        input_audio_transcription=types.AudioTranscriptionConfig(),
+        # Resumption handles are only needed to re-open parked streams
+        session_resumption=types.SessionResumptionConfig() if resumable else None,
+    )
+
+
+def build_text_run_config(resumable: bool = IDLE_PARK_SECONDS > 0) -> RunConfig:
+    """RunConfig for a typed chat session: text replies, no audio generation or transcription."""
+    return RunConfig(
+        streaming_mode=StreamingMode.BIDI,
+        response_modalities=["TEXT"],
+        session_resumption=types.SessionResumptionConfig() if resumable else None,
+    )
+
+
+async def run_live_session(
+    websocket: WebSocket,
+    user_id: str,
+    session_id: str,
+    live_runner: Runner,
+    recorder: Optional[SessionRecorder] = None,
+    audio_codec: str = "pcm",
+    pool: Optional[LiveSessionPool] = None,
+    response_mode: str = "audio",
+    idle_park_seconds: float = IDLE_PARK_SECONDS,
+    persist_usage: bool = True,
+) -> None:
+    """Runs one bidirectional streaming session between a WebSocket and ADK.
+
+    The runner (and through it the session service) is injected so
+    session_replay.py can drive the same pipeline with recorded events instead
+    of a live model; replays also turn off parking and usage persistence. New
+    voice sessions take a warm connection from the pool when one is given.
+    With response_mode="text" the model replies in text only, without audio or
+    transcriptions.
+    
+    Protocol:
+    - Client sends: {"type": "audio", "data": base64_encoded_pcm}
+    - Client sends: {"type": "video", "data": base64_encoded_jpeg, "mimeType": "image/jpeg"}
+    - Client sends: {"type": "text", "data": "message"}
+    - Client sends: {"type": "ping"} - keep-alive
+    - Server sends: {"type": "audio", "data": base64_encoded_audio, "codec": "pcm" | "opus"}
+    - Server sends: {"type": "text", "data": "reply chunk"} - text response mode
+    - Server sends: {"type": "tool_call", "data": {...}}
+    - Server sends: {"type": "turn_complete", "session_id": "..."}
+    - Server sends: {"type": "interrupted", "data": "..."}
+    - Server sends: {"type": "status", "status": "connected" | "parked" | "resumed"}
+    - Server sends: {"type": "session_handle", "data": "..."} - when idle parking is enabled
+
+    Typed text is sent to the agent in both modes.
+    """
+    logger.debug(
+        f"WebSocket connection request: user_id={user_id}, session_id={session_id}"
+    )
+    await websocket.accept()
+    logger.debug("WebSocket connection accepted")
+
+    # Session data collectors
+    session_start_time = datetime.utcnow()
+    connect_time = time.monotonic()
+    conversation_messages: List[Dict[str, Any]] = []
+
+    # ========================================
+    # Phase 2: Session Initialization
+    # ========================================
+
+    text_mode = response_mode == "text"
+    make_run_config = build_text_run_config if text_mode else build_run_config
+    run_config = make_run_config(resumable=idle_park_seconds > 0)
+
+    if text_mode:
+        logger.debug("RunConfig created for text responses")
+    else:
+        logger.debug(f"RunConfig created with voice: {VOICE_NAME}")
+
+    # ADK session IDs differ from the caller's when the session came from the pool
+    adk_user_id, adk_session_id = pool.resolve(user_id, session_id) if pool else (user_id, session_id)
+    pooled: Optional[PooledLiveConnection] = None
+
+    # Get or create session
+    session_service = live_runner.session_service
+    session = await session_service.get_session(
+        app_name=live_runner.app_name, user_id=adk_user_id, session_id=adk_session_id
+    )
+    if not session and pool and not text_mode:
+        pooled = pool.acquire(user_id, session_id)
+        if pooled:
+            adk_user_id, adk_session_id = pooled.user_id, pooled.session_id
+            logger.info(f"📝 New session from warm pool: user_id={user_id}, session_id={session_id}")
+    if not session and not pooled:
+        session = await session_service.create_session(
+            app_name=live_runner.app_name, user_id=user_id, session_id=session_id
+        )
+        logger.info(f"📝 Created new session: user_id={user_id}, session_id={session_id}")
+    elif session:
+        logger.info(f"♻️ Resuming session: user_id={user_id}, session_id={session_id}")
+
+    # Create live request queue for this session (already open for pooled connections)
+    live_request_queue = pooled.live_request_queue if pooled else LiveRequestQueue()
+    live_stream: Optional[LiveStream] = pooled
+
+    # Idle parking state: the model stream is closed while parked and re-opened on voice
+    current_session_handle = None
+    last_activity = time.monotonic()
+    parked = False
+    parked_at = 0.0
+    resumed = asyncio.Event()
+
+    # Outbound audio encoder (raw PCM or Opus) with bandwidth/CPU accounting
+    audio_encoder = OutboundAudioEncoder(audio_codec, RECEIVE_SAMPLE_RATE)
+
+    # Per-session resource accounting; tools record into it via the context variable
+    usage = pooled.usage if pooled else SessionUsage(user_id, session_id)
+    usage.response_mode = response_mode
+    current_usage.set(usage)
+    first_audio_ms: Optional[float] = None
+    usage_key = f"{user_id}/{session_id}/{id(usage)}"
+    active_sessions[usage_key] = usage
+
+    # Customer identifiers already prefetched (spoken or typed)
+    prefetched_identifiers: Set[str] = set()
+    prefetch_tasks: Set[asyncio.Task] = set()
+
+    # ========================================
+    # Phase 3: Task Functions
+    # ========================================
+
+    def prefetch_identifiers(text: str) -> None:
+        """Speculatively prefetch customer data before the model asks for it."""
+        for identifier in find_customer_identifiers(text):
+            if identifier not in prefetched_identifiers:
+                prefetched_identifiers.add(identifier)
+                logger.info(f"🔮 Prefetching customer context: {identifier}")
+                task = asyncio.create_task(prefetch_customer_context(identifier))
+                prefetch_tasks.add(task)
+                task.add_done_callback(prefetch_tasks.discard)
+
+    async def park() -> None:
+        """Close the model stream of an idle caller, keeping the resumption handle."""
+        nonlocal parked, parked_at
+        parked = True
+        parked_at = time.monotonic()
+        resumed.clear()
+        parked_sessions.add(usage_key)
+        usage.parks += 1
+        logger.info(f"🅿️ Parking idle session {session_id} ({len(parked_sessions)} parked)")
+        await live_stream.close()
+        if parked:
+            await websocket.send_json({"type": "status", "status": "parked"})
+
+    async def resume() -> None:
+        """Re-open the model stream of a parked caller from the resumption handle."""
+        nonlocal parked, live_request_queue, live_stream
+        resume_config = make_run_config(resumable=True)
+        if current_session_handle:
+            resume_config.session_resumption = types.SessionResumptionConfig(handle=current_session_handle)
+        live_request_queue = LiveRequestQueue()
+        live_stream = LiveStream(live_runner, adk_user_id, adk_session_id, resume_config, live_request_queue)
+
+        parked = False
+        usage.parked_seconds += time.monotonic() - parked_at
+        parked_sessions.discard(usage_key)
+        resumed.set()
+        logger.info(f"▶️ Resuming parked session {session_id} ({len(parked_sessions)} parked)")
+        await websocket.send_json({"type": "status", "status": "resumed"})
+
+    async def live_events():
+        """Events of the session's model streams, waiting through parked periods."""
+        while True:
+            stream = live_stream
+            async for event in stream.events():
+                yield event
+            if live_stream is not stream:
+                continue  # Already resumed on a new stream
+            if not parked:
+                return  # Stream ended on its own
+            await resumed.wait()
+
+    async def idle_watchdog() -> None:
+        """Parks the session after idle_park_seconds without voice or turns."""
+        while True:
+            await asyncio.sleep(min(idle_park_seconds / 4, 5))
+            if (
+                not parked
+                and live_stream is not None
+                and not usage.has_pending_sub_agent_calls()
+                and time.monotonic() - last_activity >= idle_park_seconds
+            ):
+                await park()
+
+    async def upstream_task() -> None:
+        """Receives messages from WebSocket and sends to LiveRequestQueue."""
+        nonlocal last_activity
+        try:
+            while True:
+                message = await websocket.receive_text()
+                try:
+                    data = json.loads(message)
+                    msg_type = data.get("type")
+
+                    if recorder and msg_type not in ("audio", "video"):
+                        recorder.record_client_json(message)
+
+                    if msg_type == "audio":
+                        # Decode base64 audio and send to Gemini
+                        audio_bytes = base64.b64decode(data.get("data", ""))
+                        if recorder:
+                            recorder.record_client_audio(audio_bytes)
+                        if idle_park_seconds and is_voiced(audio_bytes):
+                            last_activity = time.monotonic()
+                            if parked:
+                                await resume()
+                        if parked:
+                            # Silence from an idle caller is not forwarded while parked
+                            continue
+                        usage.record_audio_in(len(audio_bytes), SEND_SAMPLE_RATE)
+                        live_request_queue.send_realtime(
+                            types.Blob(
+                                data=audio_bytes,
+                                mime_type=f"audio/pcm;rate={SEND_SAMPLE_RATE}",
+                            )
+                        )
+
+                    elif msg_type == "video":
+                        # Decode base64 video frame and send to Gemini
+                        video_bytes = base64.b64decode(data.get("data", ""))
+                        if recorder:
+                            recorder.record_client_video(video_bytes)
+                        if parked:
+                            continue
+                        usage.video_frames += 1
+                        live_request_queue.send_realtime(
+                            types.Blob(
+                                data=video_bytes,
+                                mime_type="image/jpeg",
+                            )
+                        )
+                        logger.debug("Video frame sent to Gemini")
+
+                    elif msg_type == "text":
+                        # Send typed text to the agent as a user turn
+                        text_data = data.get("data", "").strip()
+                        if not text_data:
+                            continue
+                        logger.info(f"📝 Received text: {text_data}")
+                        usage.text_messages += 1
+                        last_activity = time.monotonic()
+                        if parked:
+                            await resume()
+                        if SPECULATIVE_PREFETCH:
+                            # Typed messages carry exact IDs; start the lookup before the model asks
+                            prefetch_identifiers(text_data)
+                        live_request_queue.send_content(
+                            types.Content(role="user", parts=[types.Part(text=text_data)])
+                        )
+                        conversation_messages.append({
+                            "role": "user",
+                            "text": text_data,
+                            "timestamp": datetime.utcnow().isoformat()
+                        })
+
+                    elif msg_type == "ping":
+                        # Keep-alive ping
+                        await websocket.send_json({"type": "pong"})
+
+                    elif msg_type == "end_session":
+                        # Client wants to end session
+                        logger.info("📴 Client requested session end")
+                        break
+
+                except json.JSONDecodeError:
+                    logger.error("Invalid JSON message received")
+                except Exception as e:
+                    logger.error(f"Error processing upstream message: {e}")
+
+        except WebSocketDisconnect:
+            logger.info("WebSocket disconnected in upstream task")
+        except Exception as e:
+            logger.error(f"Upstream task error: {e}")
+
+    async def downstream_task() -> None:
+        """Receives Events from run_live() and sends to WebSocket."""
+        nonlocal conversation_messages, first_audio_ms, current_session_handle, last_activity, live_stream
+        
+        # Track transcriptions (and text replies in text mode)
+        input_texts = []
+        output_texts = []
+        streamed_text = False
+        interrupted = False
+
+        logger.debug("Starting downstream task with run_live()")
+
+        # Send initial status message
+        await websocket.send_json({
+            "type": "status",
+            "status": "connected",
+            "audio_codec": audio_encoder.codec,
+            "response_mode": response_mode
+        })
+
+        if live_stream is None:
+            live_stream = LiveStream(live_runner, adk_user_id, adk_session_id, run_config, live_request_queue)
+
+        try:
+            async for event in live_events():
+                try:
+                    if recorder:
+                        recorder.record_event(event)
+
+                    # Handle session resumption update
+                    if (
+                        hasattr(event, "live_session_resumption_update")
+                        and event.live_session_resumption_update
+                    ):
+                        update = event.live_session_resumption_update
+                        if update.resumable and update.new_handle:
+                            current_session_handle = update.new_handle
+                            logger.info(f"🆔 Session handle: {current_session_handle}")
+                            await websocket.send_json({
+                                "type": "session_handle",
+                                "data": current_session_handle
+                            })
+
+                    # Handle input transcription
+                    if hasattr(event, 'input_transcription') and event.input_transcription:
+                        text = event.input_transcription.text
+                        is_final = event.input_transcription.finished
+                        if text:
+                            logger.info(f"🎤 INPUT TRANSCRIPTION: {text[:100]}... (finished={is_final})")
+                            input_texts.append(text)
+                            last_activity = time.monotonic()
+                            await websocket.send_json({
+                                "type": "input_transcription",
+                                "text": text,
+                                "finished": is_final
+                            })
+
+                            if SPECULATIVE_PREFETCH:
+                                prefetch_identifiers("".join(input_texts))
+
+                    # Handle output transcription
+                    if hasattr(event, 'output_transcription') and event.output_transcription:
+                        text = event.output_transcription.text
+                        is_final = event.output_transcription.finished
+                        if text:
+                            logger.info(f"📝 OUTPUT TRANSCRIPTION: {text[:100]}... (finished={is_final})")
+                            output_texts.append(text)
+                            await websocket.send_json({
+                                "type": "output_transcription",
+                                "text": text,
+                                "finished": is_final
+                            })
+
+                    # Handle tool calls (sub-agent invocations)
+                    for fc in event.get_function_calls():
+                        logger.info(f"📞 TOOL CALLED: {fc.name}")
+                        usage.start_sub_agent_call(fc.id, fc.name)
+                        await websocket.send_json({
+                            "type": "tool_call",
+                            "data": {
+                                "name": fc.name,
+                                "args": dict(fc.args) if fc.args else {}
+                            }
+                        })
+
+                    # Log function responses
+                    for fr in event.get_function_responses():
+                        logger.info(f"📋 TOOL RESPONSE for {fr.name}: {str(fr.response)[:500]}...")
+                        usage.finish_sub_agent_call(fr.id, fr.name)
+
+                    # Handle audio and text content
+                    if event.content and event.content.parts:
+                        for part in event.content.parts:
+                            if text_mode and part.text and not part.thought and event.author != "user":
+                                last_activity = time.monotonic()
+                                if event.partial:
+                                    # Stream reply chunks as they arrive
+                                    streamed_text = True
+                                    usage.text_out_chars += len(part.text)
+                                    await websocket.send_json({"type": "text", "data": part.text})
+                                else:
+                                    # The full reply follows its chunks; only send it if nothing was streamed
+                                    output_texts.append(part.text)
+                                    if not streamed_text:
+                                        usage.text_out_chars += len(part.text)
+                                        await websocket.send_json({"type": "text", "data": part.text})
+                                    streamed_text = False
+                            if part.inline_data and part.inline_data.data:
+                                usage.record_audio_out(len(part.inline_data.data), RECEIVE_SAMPLE_RATE)
+                                last_activity = time.monotonic()
+                                # Encode (PCM or Opus) and base64 for JSON transmission
+                                b64_audio = await audio_encoder.encode(part.inline_data.data)
+                                if b64_audio:
+                                    await websocket.send_json({
+                                        "type": "audio",
+                                        "data": b64_audio,
+                                        "codec": audio_encoder.codec
+                                    })
+                                    if first_audio_ms is None:
+                                        first_audio_ms = (time.monotonic() - connect_time) * 1000
+
+                    # Handle interruption
+                    if event.interrupted and not interrupted:
+                        logger.info("🤐 INTERRUPTION DETECTED")
+                        audio_encoder.discard_pending()
+                        await websocket.send_json({
+                            "type": "interrupted",
+                            "data": "Response interrupted by user input"
+                        })
+                        interrupted = True
+
+                    # Handle turn completion
+                    if event.turn_complete:
+                        usage.turns += 1
+                        last_activity = time.monotonic()
+                        if not interrupted:
+                            # Emit the last partial Opus frame of the turn
+                            b64_audio = await audio_encoder.encode(b"", flush=True)
+                            if b64_audio:
+                                await websocket.send_json({
+                                    "type": "audio",
+                                    "data": b64_audio,
+                                    "codec": audio_encoder.codec
+                                })
+                            logger.info("✅ Turn complete")
+                            await websocket.send_json({
+                                "type": "turn_complete",
+                                "session_id": current_session_handle
+                            })
+
+                        # Log transcriptions
+                        if input_texts:
+                            unique_texts = list(dict.fromkeys(input_texts))
+                            full_input = " ".join(unique_texts)
+                            logger.info(f"🎤 Input: {full_input}")
+                            conversation_messages.append({
+                                "role": "user",
+                                "text": full_input,
+                                "timestamp": datetime.utcnow().isoformat()
+                            })
+
+                        if output_texts:
+                            unique_texts = list(dict.fromkeys(output_texts))
+                            full_output = " ".join(unique_texts)
+                            logger.info(f"🔊 Output: {full_output}")
+                            conversation_messages.append({
+                                "role": "assistant",
+                                "text": full_output,
+                                "timestamp": datetime.utcnow().isoformat()
+                            })
+
+                        # Reset for next turn
+                        input_texts = []
+                        output_texts = []
+                        streamed_text = False
+                        interrupted = False
+
+                except Exception as e:
+                    logger.error(f"Error processing event: {e}")
+
+        except Exception as e:
+            logger.error(f"Downstream task error: {e}")
+
+    # ========================================
+    # Phase 4: Run Tasks Concurrently
+    # ========================================
+
+    try:
+        tasks = [
+            asyncio.create_task(upstream_task()),
+            asyncio.create_task(downstream_task()),
+        ]
+        if idle_park_seconds:
+            tasks.append(asyncio.create_task(idle_watchdog()))
+
+        # Wait for any task to complete (or fail)
+        done, pending = await asyncio.wait(
+            tasks,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+
+        # Cancel remaining tasks
+        for task in pending:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    except WebSocketDisconnect:
+        logger.info(f"WebSocket disconnected: user_id={user_id}, session_id={session_id}")
+    except Exception as e:
+        logger.error(f"WebSocket error: {e}")
+    finally:
+        if live_stream:
+            await live_stream.close()
+        if parked:
+            usage.parked_seconds += time.monotonic() - parked_at
+        parked_sessions.discard(usage_key)
+        if pool:
+            pool.release(user_id, session_id)
+            if first_audio_ms is not None:
+                pool.record_first_audio(first_audio_ms, pooled is not None)
+
+        # Aggregate, log and store the session's resource usage
+        active_sessions.pop(usage_key, None)
+        usage.ended_at = time.time()
+        usage.audio_out_wire_bytes = audio_encoder.wire_bytes
+        session_duration = (datetime.utcnow() - session_start_time).total_seconds()
+        summary = {
+            **usage.summary(),
+            "messages": len(conversation_messages),
+            "audio_out_codec": audio_encoder.codec,
+            "audio_out_wire_kbps": audio_encoder.summary(session_duration)["wire_kbps"],
+            "audio_encode_cpu_ms": round(audio_encoder.encode_cpu_seconds * 1000, 1),
+            "first_audio_ms": round(first_audio_ms, 1) if first_audio_ms is not None else None,
+            "live_pool_hit": pooled is not None,
+        }
+        logger.info(f"📊 Session ended: {json.dumps(summary)}")
+        if persist_usage:
+            await save_session_usage(summary)
@@ -0,0 +1,87 @@
+"""Closable wrapper around a run_live() event stream.
+
+run_live() is an async generator, so it can only be stopped by whoever is
+iterating it. LiveStream pumps it into a queue from a background task instead,
+which lets the connection be opened ahead of time (live_pool.py) or closed from
+outside while a caller is idle (parking in main.py).
+"""
+
+import asyncio
+import logging
+from typing import Any, AsyncGenerator, Optional
+
+from google.adk.agents.live_request_queue import LiveRequestQueue
+from google.adk.agents.run_config import RunConfig
+
+from tat_neu.usage import SessionUsage, current_usage
+
+logger = logging.getLogger(__name__)
+
+_END_OF_STREAM = object()
+# Events buffered ahead of the consumer; a slow client makes _pump wait on put(),
+# which in turn slows run_live() instead of piling model audio up in memory
+_MAX_BUFFERED_EVENTS = 8
+
+
+class LiveStream:
+    """A run_live() stream pumped into a queue by a background task."""
+
+    def __init__(
+        self,
+        runner: Any,
+        user_id: str,
+        session_id: str,
+        run_config: RunConfig,
+        live_request_queue: Optional[LiveRequestQueue] = None,
+        usage: Optional[SessionUsage] = None,
+    ):
+        self.user_id = user_id
+        self.session_id = session_id
+        self.live_request_queue = live_request_queue or LiveRequestQueue()
+
+        self._events: asyncio.Queue = asyncio.Queue(maxsize=_MAX_BUFFERED_EVENTS)
+        self._task = asyncio.create_task(self._pump(runner, run_config, usage))
+
+    async def _pump(self, runner: Any, run_config: RunConfig, usage: Optional[SessionUsage]) -> None:
+        # Tools run inside this task, so bind the usage they should record into
+        if usage is not None:
+            current_usage.set(usage)
+        try:
+            try:
+                async for event in runner.run_live(
+                    user_id=self.user_id,
+                    session_id=self.session_id,
+                    live_request_queue=self.live_request_queue,
+                    run_config=run_config,
+                ):
+                    await self._events.put(event)
+            except Exception as e:
+                logger.error(f"Live stream error: {e}")
+            await self._events.put(_END_OF_STREAM)
+        except asyncio.CancelledError:
+            # close(): drop undelivered events so the end marker never waits on a full queue
+            while not self._events.empty():
+                self._events.get_nowait()
+            self._events.put_nowait(_END_OF_STREAM)
+            raise
+
+    @property
+    def alive(self) -> bool:
+        return not self._task.done()
+
+    async def events(self) -> AsyncGenerator[Any, None]:
+        """Events of the live stream, as runner.run_live() would yield them."""
+        while True:
+            event = await self._events.get()
+            if event is _END_OF_STREAM:
+                return
+            yield event
+
+    async def close(self) -> None:
+        """Close the model stream and stop the pump task."""
+        self.live_request_queue.close()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
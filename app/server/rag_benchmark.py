@@ -0,0 +1,190 @@
+"""Benchmark RAG context assembly against plain top_k=10 concatenation.
+
+For each query, compares the context the rag_retrieval_agent would receive with
+and without tat_neu.sub_agents.rag_context: plain top_k=10 retrieval against
+per-query top_k plus assembly (size in characters and estimated tokens, chunks
+retrieved and kept). With --answer it also runs the rag_retrieval_agent end to end in
+both modes and compares answer latency and prompt tokens reported by the model.
+
+Usage:
+    python rag_benchmark.py
+    python rag_benchmark.py --queries queries.txt        # one query per line
+    python rag_benchmark.py --answer --repeat 3
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from vertexai.preview import rag
+from vertexai.preview.rag import RagRetrievalConfig
+
+from tat_neu.sub_agents import rag_agent
+from tat_neu.sub_agents.rag_context import (
+    CHUNK_SEPARATOR,
+    RAG_MAX_TOP_K,
+    assemble_context,
+    estimate_tokens,
+    retrieve_adaptive,
+)
+
+DEFAULT_QUERIES = [
+    "What is the annual fee for the Neu Infinity card?",
+    "How many NeuCoins do I earn on Tata Neu purchases?",
+    "How do I convert a transaction to EMI?",
+    "What documents do I need to apply for a NeuCard?",
+    "What is the late payment fee?",
+    "How do I block my card if it is lost?",
+]
+
+
+def _retrieve(query: str, top_k: int) -> List[Tuple[str, Optional[float]]]:
+    response = rag.retrieval_query(
+        rag_resources=[rag.RagResource(rag_corpus=rag_agent.CORPUS_NAME)],
+        text=query,
+        rag_retrieval_config=RagRetrievalConfig(top_k=top_k),
+    )
+    contexts = response.contexts.contexts if response.contexts else []
+    return [(ctx.text, getattr(ctx, "score", None)) for ctx in contexts]
+
+
+def _compare_context(query: str) -> Dict[str, Any]:
+    contexts = _retrieve(query, RAG_MAX_TOP_K)
+    baseline = CHUNK_SEPARATOR.join(text for text, _ in contexts)
+
+    top_ks: List[int] = []
+
+    def retrieve(top_k: int) -> List[Tuple[str, Optional[float]]]:
+        top_ks.append(top_k)
+        return _retrieve(query, top_k)
+
+    scored_chunks = retrieve_adaptive(retrieve)
+    started = time.perf_counter()
+    assembled = assemble_context(scored_chunks)
+    assembly_ms = (time.perf_counter() - started) * 1000
+
+    return {
+        "query": query,
+        "baseline_chunks": len(contexts),
+        "baseline_chars": len(baseline),
+        "baseline_tokens": estimate_tokens(baseline),
+        "assembled_top_k": top_ks[-1],
+        "assembled_retrievals": len(top_ks),
+        "assembled_chunks": len(assembled.chunks),
+        "assembled_chars": len(assembled.text),
+        "assembled_tokens": assembled.tokens,
+        "duplicates": assembled.duplicates,
+        "low_relevance": assembled.retrieved - assembled.relevant,
+        "over_budget": assembled.over_budget,
+        "assembly_ms": round(assembly_ms, 2),
+    }
+
+
+async def _answer(runner: Any, query: str) -> Dict[str, Any]:
+    from google.genai import types
+
+    user_id = "rag-benchmark"
+    session_id = f"bench-{uuid.uuid4().hex[:8]}"
+    await runner.session_service.create_session(
+        app_name=runner.app_name, user_id=user_id, session_id=session_id
+    )
+
+    prompt_tokens = 0
+    answer = ""
+    started = time.perf_counter()
+    async for event in runner.run_async(
+        user_id=user_id,
+        session_id=session_id,
+        new_message=types.Content(role="user", parts=[types.Part(text=query)]),
+    ):
+        if event.usage_metadata and event.usage_metadata.prompt_token_count:
+            prompt_tokens += event.usage_metadata.prompt_token_count
+        if event.is_final_response() and event.content and event.content.parts:
+            answer = "".join(part.text or "" for part in event.content.parts)
+    latency_ms = (time.perf_counter() - started) * 1000
+
+    return {"latency_ms": latency_ms, "prompt_tokens": prompt_tokens, "answer_chars": len(answer)}
+
+
+async def _compare_answers(queries: List[str], repeat: int) -> Dict[str, Any]:
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+
+    runner = Runner(
+        app_name="rag_benchmark",
+        agent=rag_agent.rag_retrieval_agent,
+        session_service=InMemorySessionService(),
+    )
+
+    results: Dict[str, Any] = {}
+    for label, enabled in (("baseline", False), ("assembled", True)):
+        # retrieve_neucard_faq reads the flag on every call
+        rag_agent.RAG_CONTEXT_ASSEMBLY = enabled
+        runs = [await _answer(runner, query) for _ in range(repeat) for query in queries]
+        latencies = [run["latency_ms"] for run in runs]
+        results[label] = {
+            "runs": len(runs),
+            "avg_latency_ms": round(statistics.mean(latencies), 1),
+            "p50_latency_ms": round(statistics.median(latencies), 1),
+            "max_latency_ms": round(max(latencies), 1),
+            "avg_prompt_tokens": round(statistics.mean(run["prompt_tokens"] for run in runs), 1),
+        }
+    return results
+
+
+def run_benchmark(queries: List[str], answer: bool = False, repeat: int = 1) -> Dict[str, Any]:
+    """
+    Compare baseline and assembled RAG context for a set of queries.
+
+    Args:
+        queries: Questions to retrieve context for
+        answer: Also run the rag_retrieval_agent in both modes and time the answers
+        repeat: Times each query is answered per mode (with answer=True)
+
+    Returns:
+        Report with per-query context sizes, totals and optional answer timings
+    """
+    per_query = [_compare_context(query) for query in queries]
+
+    baseline_tokens = sum(row["baseline_tokens"] for row in per_query)
+    assembled_tokens = sum(row["assembled_tokens"] for row in per_query)
+    report: Dict[str, Any] = {
+        "queries": per_query,
+        "totals": {
+            "baseline_tokens": baseline_tokens,
+            "assembled_tokens": assembled_tokens,
+            "token_reduction": round(1 - assembled_tokens / baseline_tokens, 3) if baseline_tokens else None,
+            "avg_assembly_ms": round(statistics.mean(row["assembly_ms"] for row in per_query), 2),
+        },
+    }
+    if answer:
+        report["answers"] = asyncio.run(_compare_answers(queries, repeat))
+    return report
+
+
+def _load_queries(path: Optional[str]) -> List[str]:
+    if not path:
+        return DEFAULT_QUERIES
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark RAG context assembly")
+    parser.add_argument("--queries", help="File with one query per line (default: built-in NeuCard questions)")
+    parser.add_argument("--answer", action="store_true", help="Also time rag_retrieval_agent answers in both modes")
+    parser.add_argument("--repeat", type=int, default=1, help="Answers per query and mode (with --answer)")
+    args = parser.parse_args()
+
+    report = run_benchmark(_load_queries(args.queries), args.answer, args.repeat)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    main()
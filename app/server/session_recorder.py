@@ -0,0 +1,169 @@
+"""Binary recorder for live sessions.
+
+Captures the inbound client messages and the run_live() event stream of a
+WebSocket session with timestamps, so the session can be replayed offline by
+session_replay.py. Audio and video payloads are stored as raw bytes rather than
+base64 to keep recordings compact.
+
+File layout (little endian):
+- Header: MAGIC, u32 metadata length, metadata JSON
+- Records: u8 kind, f64 seconds since start, u32 payload length, payload
+
+Event payloads are: u32 JSON length, event JSON without inline data bytes,
+u16 blob count, then per blob u16 part index, u32 length and the raw bytes.
+"""
+
+import json
+import logging
+import os
+import struct
+import time
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from google.adk.events import Event
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"TNREC1\n"
+
+# Record kinds
+CLIENT_AUDIO = 1  # Raw 16 kHz PCM from the client
+CLIENT_VIDEO = 2  # Raw JPEG frame from the client
+CLIENT_JSON = 3  # Any other client message, verbatim
+EVENT = 4  # One event from run_live()
+
+_RECORD_HEADER = struct.Struct("<BdI")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_BLOB_HEADER = struct.Struct("<HI")
+
+# Inline audio bytes are stored raw after the event JSON instead of base64 inside it
+_EVENT_EXCLUDE = {"content": {"parts": {"__all__": {"inline_data": {"data"}}}}}
+
+
+def encode_event(event: Event) -> bytes:
+    """Serialize an event with its inline data stored as raw blobs."""
+    blobs = []
+    if event.content and event.content.parts:
+        for index, part in enumerate(event.content.parts):
+            if part.inline_data and part.inline_data.data:
+                blobs.append((index, part.inline_data.data))
+
+    event_json = event.model_dump_json(exclude_none=True, exclude=_EVENT_EXCLUDE).encode("utf-8")
+    chunks = [_U32.pack(len(event_json)), event_json, _U16.pack(len(blobs))]
+    for index, data in blobs:
+        chunks.append(_BLOB_HEADER.pack(index, len(data)))
+        chunks.append(data)
+    return b"".join(chunks)
+
+
+def decode_event(payload: bytes) -> Event:
+    """Rebuild an event serialized by encode_event()."""
+    json_len = _U32.unpack_from(payload, 0)[0]
+    offset = _U32.size
+    event = Event.model_validate_json(payload[offset:offset + json_len])
+    offset += json_len
+
+    blob_count = _U16.unpack_from(payload, offset)[0]
+    offset += _U16.size
+    for _ in range(blob_count):
+        index, length = _BLOB_HEADER.unpack_from(payload, offset)
+        offset += _BLOB_HEADER.size
+        event.content.parts[index].inline_data.data = payload[offset:offset + length]
+        offset += length
+    return event
+
+
+class SessionRecorder:
+    """Appends timestamped client messages and model events to a recording file."""
+
+    def __init__(self, path: str, metadata: Dict[str, Any]):
+        self.path = path
+        self._file: Optional[BinaryIO] = open(path, "wb")
+        self._start = time.monotonic()
+        self.record_count = 0
+
+        metadata_json = json.dumps(metadata).encode("utf-8")
+        self._file.write(MAGIC + _U32.pack(len(metadata_json)) + metadata_json)
+
+    @classmethod
+    def for_session(cls, directory: str, user_id: str, session_id: str, **metadata: Any) -> "SessionRecorder":
+        """Create a recorder writing to a new file in the recording directory."""
+        os.makedirs(directory, exist_ok=True)
+        started_at = datetime.utcnow()
+        filename = f"{session_id}-{started_at.strftime('%Y%m%dT%H%M%S')}.tnrec"
+        return cls(
+            os.path.join(directory, filename),
+            {
+                "user_id": user_id,
+                "session_id": session_id,
+                "started_at": started_at.isoformat(),
+                **metadata,
+            },
+        )
+
+    def _write(self, kind: int, payload: bytes) -> None:
+        if self._file is None:
+            return
+        offset = time.monotonic() - self._start
+        self._file.write(_RECORD_HEADER.pack(kind, offset, len(payload)))
+        self._file.write(payload)
+        self.record_count += 1
+
+    def record_client_audio(self, audio_bytes: bytes) -> None:
+        """Record a raw PCM chunk received from the client."""
+        self._write(CLIENT_AUDIO, audio_bytes)
+
+    def record_client_video(self, video_bytes: bytes) -> None:
+        """Record a raw JPEG frame received from the client."""
+        self._write(CLIENT_VIDEO, video_bytes)
+
+    def record_client_json(self, message: str) -> None:
+        """Record any other client message verbatim."""
+        self._write(CLIENT_JSON, message.encode("utf-8"))
+
+    def record_event(self, event: Event) -> None:
+        """Record one event from run_live()."""
+        try:
+            self._write(EVENT, encode_event(event))
+        except Exception as e:
+            logger.error(f"Error recording event: {e}")
+
+    def close(self) -> None:
+        """Flush and close the recording file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            logger.info(f"🎞️ Session recorded: {self.path} ({self.record_count} records)")
+
+
+def read_recording(path: str) -> Tuple[Dict[str, Any], List[Tuple[int, float, bytes]]]:
+    """
+    Read a recording file.
+
+    Args:
+        path: Path to a .tnrec file written by SessionRecorder
+
+    Returns:
+        Tuple of (metadata, list of (kind, seconds since start, payload))
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not a session recording: {path}")
+        metadata_len = _U32.unpack(f.read(_U32.size))[0]
+        metadata = json.loads(f.read(metadata_len))
+        return metadata, list(_iter_records(f))
+
+
+def _iter_records(f: BinaryIO) -> Iterator[Tuple[int, float, bytes]]:
+    while True:
+        header = f.read(_RECORD_HEADER.size)
+        if len(header) < _RECORD_HEADER.size:
+            return
+        kind, offset, length = _RECORD_HEADER.unpack(header)
+        payload = f.read(length)
+        if len(payload) < length:
+            # Truncated trailing record (e.g. the process died mid-write)
+            return
+        yield kind, offset, payload
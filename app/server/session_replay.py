@@ -0,0 +1,234 @@
+"""Replay a recorded live session through the real WebSocket pipeline.
+
+Feeds the client messages of a recording made with SESSION_RECORDING_DIR back
+through run_live_session() in live_session.py, with the Gemini model replaced
+by the recorded run_live() events. Useful for benchmarking protocol and
+pipeline changes against real call shapes without a model connection or GCP
+credentials. Replays do not park idle streams or write to the usage store.
+
+Usage:
+    python session_replay.py recordings/session-xyz-20260101T101500.tnrec
+    python session_replay.py recording.tnrec --speed 0      # as fast as possible
+    python session_replay.py recording.tnrec --speed 2.0    # twice real time
+    python session_replay.py recording.tnrec --speed 0 --audio-codec opus
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import time
+from collections import Counter
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+from fastapi import WebSocketDisconnect
+
+from session_recorder import (
+    CLIENT_AUDIO,
+    CLIENT_JSON,
+    CLIENT_VIDEO,
+    EVENT,
+    decode_event,
+    read_recording,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _ReplayClock:
+    """Paces recorded offsets against wall-clock time."""
+
+    def __init__(self, speed: float):
+        self.speed = speed
+        self.start = time.monotonic()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start
+
+    async def wait_until(self, offset: float) -> None:
+        if self.speed <= 0:
+            # Yield so upstream and downstream still interleave
+            await asyncio.sleep(0)
+            return
+        delay = offset / self.speed - self.elapsed()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class ReplayWebSocket:
+    """Stands in for the client WebSocket: replays client messages, collects replies."""
+
+    def __init__(
+        self,
+        records: List[Tuple[int, float, bytes]],
+        clock: _ReplayClock,
+        client_done: asyncio.Event,
+        model_done: asyncio.Event,
+    ):
+        self._records = records
+        self._clock = clock
+        self._client_done = client_done
+        self._model_done = model_done
+        self._index = 0
+        self.sent: Counter = Counter()
+        self.sent_bytes = 0
+        self.first_audio_at: Optional[float] = None
+
+    async def accept(self) -> None:
+        pass
+
+    async def receive_text(self) -> str:
+        if self._index >= len(self._records):
+            # Client is done; hang up once the model side has finished replaying
+            self._client_done.set()
+            await self._model_done.wait()
+            raise WebSocketDisconnect(code=1000)
+
+        kind, offset, payload = self._records[self._index]
+        self._index += 1
+        await self._clock.wait_until(offset)
+
+        if kind == CLIENT_AUDIO:
+            return json.dumps({"type": "audio", "data": base64.b64encode(payload).decode("utf-8")})
+        if kind == CLIENT_VIDEO:
+            return json.dumps({
+                "type": "video",
+                "data": base64.b64encode(payload).decode("utf-8"),
+                "mimeType": "image/jpeg",
+            })
+        return payload.decode("utf-8")
+
+    async def send_json(self, data: Dict[str, Any]) -> None:
+        msg_type = data.get("type")
+        self.sent[msg_type] += 1
+        self.sent_bytes += len(json.dumps(data))
+        if msg_type == "audio" and self.first_audio_at is None:
+            self.first_audio_at = self._clock.elapsed()
+
+
+class ReplayRunner:
+    """Stands in for the ADK Runner: yields recorded events instead of calling the model."""
+
+    app_name = "session-replay"
+
+    def __init__(
+        self,
+        records: List[Tuple[int, float, bytes]],
+        clock: _ReplayClock,
+        client_done: asyncio.Event,
+        model_done: asyncio.Event,
+    ):
+        from google.adk.sessions import InMemorySessionService
+
+        self._records = records
+        self._clock = clock
+        self._client_done = client_done
+        self._model_done = model_done
+        self._index = 0
+        self.session_service = InMemorySessionService()
+        self.received_bytes = 0
+
+    async def _drain(self, live_request_queue) -> None:
+        """Consume what the pipeline sends to the model, as the live connection would."""
+        while True:
+            request = await live_request_queue.get()
+            if request.close:
+                return
+            if request.blob and request.blob.data:
+                self.received_bytes += len(request.blob.data)
+
+    async def run_live(self, *, user_id, session_id, live_request_queue, run_config) -> AsyncGenerator:
+        drain = asyncio.create_task(self._drain(live_request_queue))
+        try:
+            # A re-opened stream continues where the previous one stopped
+            while self._index < len(self._records):
+                _, offset, payload = self._records[self._index]
+                await self._clock.wait_until(offset)
+                self._index += 1
+                yield decode_event(payload)
+
+            # Keep the stream open until every client message has been sent, then
+            # let the drain count what is still queued before hanging up
+            await self._client_done.wait()
+            live_request_queue.close()
+            await drain
+            self._model_done.set()
+        finally:
+            drain.cancel()
+
+
+async def replay(path: str, speed: float = 1.0, audio_codec: str = "pcm") -> Dict[str, Any]:
+    """
+    Replay a recording through run_live_session().
+
+    Args:
+        path: Recording file written by SessionRecorder
+        speed: Pacing multiplier; 1.0 is recorded pacing, 0 is as fast as possible
+        audio_codec: Outbound audio codec to benchmark ("pcm" or "opus")
+
+    Returns:
+        Dictionary with replay timings and message counts
+    """
+    # Imported here so the recording format can be inspected without the ADK stack;
+    # live_session does not build the agents, so no GCP credentials are needed
+    from audio_codec import negotiate_codec
+    from live_session import run_live_session
+
+    metadata, records = read_recording(path)
+    client_records = [r for r in records if r[0] in (CLIENT_AUDIO, CLIENT_VIDEO, CLIENT_JSON)]
+    event_records = [r for r in records if r[0] == EVENT]
+
+    clock = _ReplayClock(speed)
+    client_done = asyncio.Event()
+    model_done = asyncio.Event()
+    websocket = ReplayWebSocket(client_records, clock, client_done, model_done)
+    replay_runner = ReplayRunner(event_records, clock, client_done, model_done)
+
+    await run_live_session(
+        websocket,
+        metadata.get("user_id", "replay-user"),
+        f"replay-{metadata.get('session_id', 'session')}-{int(time.time())}",
+        replay_runner,
+        audio_codec=negotiate_codec(audio_codec),
+        response_mode=metadata.get("response_mode", "audio"),
+        idle_park_seconds=0,
+        persist_usage=False,
+    )
+
+    recorded_duration = records[-1][1] if records else 0.0
+    return {
+        "recording": path,
+        "speed": speed,
+        "audio_codec": audio_codec,
+        "response_mode": metadata.get("response_mode", "audio"),
+        "recorded_duration_s": round(recorded_duration, 3),
+        "replay_wall_time_s": round(clock.elapsed(), 3),
+        "client_messages": len(client_records),
+        "model_events": len(event_records),
+        "bytes_to_model": replay_runner.received_bytes,
+        "server_messages": dict(websocket.sent),
+        "server_bytes": websocket.sent_bytes,
+        "first_audio_s": round(websocket.first_audio_at, 3) if websocket.first_audio_at is not None else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a recorded live session")
+    parser.add_argument("recording", help="Path to a .tnrec recording")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Pacing multiplier (1.0 = recorded pacing, 0 = as fast as possible)",
+    )
+    parser.add_argument("--audio-codec", default="pcm", help="Outbound audio codec (pcm or opus)")
+    args = parser.parse_args()
+
+    report = asyncio.run(replay(args.recording, args.speed, args.audio_codec))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    main()
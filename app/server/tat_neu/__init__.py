@@ -2,6 +2,7 @@
 
 Uses AgentTool pattern for calling sub-agents:
 - Root agent: Live API (gemini-live-2.5-flash-native-audio) for voice/video
+- Text agent: the same root agent on a TEXT-output live model for typed chat
 - Sub-agents: Text model (gemini-2.5-flash) for cost efficiency
 
 Sub-agents are called as tools via AgentTool wrapper:
@@ -10,6 +11,17 @@ Sub-agents are called as tools via AgentTool wrapper:
 - rag_retrieval_agent: NeuCard FAQ and policy retrieval from RAG corpus
 """
 
-from .agent import agent
+from importlib import import_module
 
-__all__ = ["agent"]
+__all__ = ["agent", "text_agent"]
+
+
+def __getattr__(name):
+    # Agents are built on first access (they need GCP credentials), so modules such
+    # as tat_neu.usage can be imported offline, e.g. by session_replay.py
+    if name in __all__:
+        agent_module = import_module(".agent", __name__)
+        # Importing the submodule binds tat_neu.agent to it; rebind to the agents
+        globals().update(agent=agent_module.agent, text_agent=agent_module.text_agent)
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -139,3 +139,7 @@ agent = Agent(
         AgentTool(agent=rag_retrieval_agent), # NeuCard FAQ from RAG corpus
     ],
 )
+
+# Same agent, tools and session history on a live model with TEXT output, for typed chat
+# (native audio models only support the AUDIO response modality)
+text_agent = agent.clone(update={"model": os.getenv("TEXT_AGENT_MODEL", "gemini-live-2.5-flash")})
@@ -1,9 +1,22 @@
 """Sub-agents for Tata Neu Customer Care Assistant."""
 
-from .bigquery_agent import bigquery_agent
-from .rag_agent import rag_retrieval_agent
+from importlib import import_module
 
 __all__ = [
     "bigquery_agent",
     "rag_retrieval_agent",
 ]
+
+_AGENT_MODULES = {
+    "bigquery_agent": ".bigquery_agent",
+    "rag_retrieval_agent": ".rag_agent",
+}
+
+
+def __getattr__(name):
+    # Imported on first access, so customer_context can be used without the agents
+    if name in _AGENT_MODULES:
+        value = getattr(import_module(_AGENT_MODULES[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -8,10 +8,7 @@ from google.adk.agents import Agent
 from google.adk.tools.bigquery.bigquery_credentials import BigQueryCredentialsConfig
 from google.adk.tools.bigquery.bigquery_toolset import BigQueryToolset
 from google.adk.tools.bigquery.config import BigQueryToolConfig, WriteMode
-
-# BigQuery configuration
-PROJECT_ID = "general-ak"
-DATASET_ID = "tata_neu_orders"
+from .customer_context import PROJECT_ID, DATASET_ID, count_sql_tool_calls, get_customer_context
 
 # BigQuery tool config with read-only mode
 tool_config = BigQueryToolConfig(
@@ -38,6 +35,13 @@ BQ_AGENT_INSTRUCTION = """You are a BigQuery data retrieval agent for Tata Neu c
 ## YOUR ROLE
 You query the BigQuery database to fetch customer and order information.
 
+## FAST PATH: CUSTOMER CONTEXT
+For any request about a specific customer, FIRST call `get_customer_context(identifier)`
+with the customer ID (CUST001), order ID (ORD004), phone number or email the user gave.
+It returns the customer profile and their most recent orders, usually from cache.
+Only write SQL when the answer is not in that result (e.g. older orders, name search,
+aggregate questions) or when it returns found=false.
+
 ## AVAILABLE TABLES
 
 ### 1. `general-ak.tata_neu_orders.customers`
@@ -112,5 +116,6 @@ bigquery_agent = Agent(
     name="bigquery_agent",
     model="gemini-2.5-flash",
     instruction=BQ_AGENT_INSTRUCTION,
-    tools=[bq_toolset],
+    tools=[get_customer_context, bq_toolset],
+    after_tool_callback=count_sql_tool_calls,
 )
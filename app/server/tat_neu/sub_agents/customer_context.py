@@ -0,0 +1,286 @@
+"""Customer Context Cache for Tata Neu Customer Care Assistant.
+
+Looks up a customer's profile and recent orders from BigQuery by any identifier a
+caller is likely to say (customer ID, order ID, phone or email) and keeps the result
+in a short-lived in-memory cache. The cache can be warmed speculatively from the
+live input transcription so that the bigquery_agent tool call is answered from memory.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import google.auth
+from google.cloud import bigquery
+
+from ..usage import SessionUsage, current_usage, record_cache_lookup, record_data_query
+
+logger = logging.getLogger(__name__)
+
+# BigQuery configuration
+PROJECT_ID = "general-ak"
+DATASET_ID = "tata_neu_orders"
+CUSTOMERS_TABLE = f"`{PROJECT_ID}.{DATASET_ID}.customers`"
+ORDERS_TABLE = f"`{PROJECT_ID}.{DATASET_ID}.orders`"
+
+# Cache configuration
+CACHE_TTL_SECONDS = float(os.getenv("CUSTOMER_CACHE_TTL_SECONDS", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("CUSTOMER_CACHE_MAX_ENTRIES", "1000"))
+RECENT_ORDERS_LIMIT = int(os.getenv("CUSTOMER_RECENT_ORDERS_LIMIT", "5"))
+
+# Identifier patterns as they appear in (possibly spoken) transcriptions
+_CUSTOMER_ID_RE = re.compile(r"\bCUST[\s-]?(\d{3})\b", re.IGNORECASE)
+_ORDER_ID_RE = re.compile(r"\bORD[\s-]?(\d{3})\b", re.IGNORECASE)
+_EMAIL_RE = re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b")
+_PHONE_RE = re.compile(r"(?<!\d)(?:\+?91[\s-]?)?([6-9](?:[\s-]?\d){9})(?!\d)")
+
+# identifier -> (expires_at, context)
+_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+# identifier -> in-flight prefetch task
+_inflight: Dict[str, "asyncio.Task[Optional[Dict[str, Any]]]"] = {}
+_client: Optional[bigquery.Client] = None
+# Background dry runs estimating bytes scanned by SQL tool calls
+_sql_estimates: Set["asyncio.Task[None]"] = set()
+
+
+def find_customer_identifiers(text: str) -> List[str]:
+    """
+    Extract normalized customer identifiers from free text.
+
+    Args:
+        text: Transcribed or typed customer speech
+
+    Returns:
+        List of identifiers such as "CUST001", "ORD004", "9876543210" or an email
+    """
+    if not text:
+        return []
+
+    found = []
+    for match in _CUSTOMER_ID_RE.finditer(text):
+        found.append(f"CUST{match.group(1)}")
+    for match in _ORDER_ID_RE.finditer(text):
+        found.append(f"ORD{match.group(1)}")
+    for match in _EMAIL_RE.finditer(text):
+        found.append(match.group(0).lower())
+    for match in _PHONE_RE.finditer(text):
+        found.append(re.sub(r"\D", "", match.group(1)))
+
+    return list(dict.fromkeys(found))
+
+
+def _normalize_identifier(identifier: str) -> str:
+    """Normalize an identifier to its cache key."""
+    identifiers = find_customer_identifiers(identifier)
+    return identifiers[0] if identifiers else identifier.strip().lower()
+
+
+def _get_client() -> bigquery.Client:
+    """Lazily create the BigQuery client with application default credentials."""
+    global _client
+    if _client is None:
+        credentials, _ = google.auth.default()
+        _client = bigquery.Client(project=PROJECT_ID, credentials=credentials)
+    return _client
+
+
+def _to_json_value(value: Any) -> Any:
+    """Convert BigQuery row values into JSON-serializable values."""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _run_query(sql: str, params: List[bigquery.ScalarQueryParameter]) -> List[Dict[str, Any]]:
+    """Run a parameterized query and return rows as dictionaries."""
+    job = _get_client().query(sql, job_config=bigquery.QueryJobConfig(query_parameters=params))
+    rows = [{k: _to_json_value(v) for k, v in row.items()} for row in job.result()]
+
+    record_data_query(job.total_bytes_processed or 0)
+    return rows
+
+
+def _customer_filter(identifier: str) -> Tuple[str, bigquery.ScalarQueryParameter]:
+    """Build the WHERE clause that finds a customer for the given identifier."""
+    if identifier.startswith("CUST"):
+        return "c.customer_id = @identifier", bigquery.ScalarQueryParameter("identifier", "STRING", identifier)
+    if identifier.startswith("ORD"):
+        return (
+            f"c.customer_id = (SELECT customer_id FROM {ORDERS_TABLE} WHERE order_id = @identifier)",
+            bigquery.ScalarQueryParameter("identifier", "STRING", identifier),
+        )
+    if "@" in identifier:
+        return "LOWER(c.email) = @identifier", bigquery.ScalarQueryParameter("identifier", "STRING", identifier)
+    return (
+        "ENDS_WITH(REGEXP_REPLACE(c.phone, r'\\D', ''), @identifier)",
+        bigquery.ScalarQueryParameter("identifier", "STRING", identifier),
+    )
+
+
+def fetch_customer_context(identifier: str) -> Optional[Dict[str, Any]]:
+    """
+    Fetch a customer's profile and recent orders from BigQuery (uncached).
+
+    Args:
+        identifier: Normalized customer ID, order ID, phone or email
+
+    Returns:
+        Dictionary with "customer" and "recent_orders", or None if no customer matched
+    """
+    where, param = _customer_filter(identifier)
+    customers = _run_query(f"SELECT c.* FROM {CUSTOMERS_TABLE} c WHERE {where} LIMIT 1", [param])
+    if not customers:
+        return None
+
+    customer = customers[0]
+    orders = _run_query(
+        f"SELECT * FROM {ORDERS_TABLE} WHERE customer_id = @customer_id "
+        f"ORDER BY order_date DESC LIMIT {RECENT_ORDERS_LIMIT}",
+        [bigquery.ScalarQueryParameter("customer_id", "STRING", customer["customer_id"])],
+    )
+    return {"customer": customer, "recent_orders": orders}
+
+
+def _cache_get(key: str) -> Optional[Dict[str, Any]]:
+    """Return a cached context if present and not expired."""
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    expires_at, context = entry
+    if expires_at < time.monotonic():
+        _cache.pop(key, None)
+        return None
+    return context
+
+
+def _cache_put(key: str, context: Dict[str, Any]) -> None:
+    """Store a context under its identifier and the resolved customer ID."""
+    if len(_cache) >= CACHE_MAX_ENTRIES:
+        # Evict the entry closest to expiry
+        oldest = min(_cache, key=lambda k: _cache[k][0])
+        _cache.pop(oldest, None)
+
+    expires_at = time.monotonic() + CACHE_TTL_SECONDS
+    _cache[key] = (expires_at, context)
+    _cache[context["customer"]["customer_id"]] = (expires_at, context)
+
+
+async def prefetch_customer_context(identifier: str) -> Optional[Dict[str, Any]]:
+    """
+    Speculatively warm the cache for an identifier in the background.
+
+    Concurrent prefetches of the same identifier share one BigQuery lookup.
+
+    Args:
+        identifier: Customer identifier spotted in the transcription
+
+    Returns:
+        The fetched context, or None if the customer was not found or the lookup failed
+    """
+    key = _normalize_identifier(identifier)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    task = _inflight.get(key)
+    if task is None:
+        async def _fetch() -> Optional[Dict[str, Any]]:
+            try:
+                context = await asyncio.to_thread(fetch_customer_context, key)
+                if context is not None:
+                    _cache_put(key, context)
+                    logger.info(f"🔮 Prefetched customer context for {key}")
+                return context
+            except Exception as e:
+                logger.warning(f"Prefetch failed for {key}: {e}")
+                return None
+            finally:
+                _inflight.pop(key, None)
+
+        task = asyncio.create_task(_fetch())
+        _inflight[key] = task
+
+    return await asyncio.shield(task)
+
+
+async def get_customer_context(identifier: str) -> dict:
+    """
+    Get a customer's profile and recent orders by customer ID, order ID, phone or email.
+
+    Args:
+        identifier: Customer ID (CUST001), order ID (ORD004), phone number or email address
+
+    Returns:
+        Dictionary with the customer profile and their most recent orders
+    """
+    key = _normalize_identifier(identifier)
+    logger.info(f"👤 CUSTOMER CONTEXT LOOKUP: '{key}'")
+
+    context = _cache_get(key)
+    if context is not None:
+        record_cache_lookup(hit=True)
+        logger.info(f"⚡ Customer context cache hit for {key}")
+        return {"found": True, "source": "cache", **context}
+
+    # A speculative prefetch of this identifier is still running: wait for it
+    task = _inflight.get(key)
+    if task is not None:
+        context = await asyncio.shield(task)
+        if context is not None:
+            record_cache_lookup(hit=True)
+            logger.info(f"⚡ Customer context served by in-flight prefetch for {key}")
+            return {"found": True, "source": "prefetch", **context}
+
+    record_cache_lookup(hit=False)
+    try:
+        context = await asyncio.to_thread(fetch_customer_context, key)
+    except Exception as e:
+        logger.error(f"❌ Customer context error: {str(e)}", exc_info=True)
+        return {"found": False, "error": f"Error looking up customer: {str(e)}"}
+
+    if context is None:
+        return {"found": False, "error": f"No customer found for: '{identifier}'"}
+
+    _cache_put(key, context)
+    return {"found": True, "source": "bigquery", **context}
+
+
+def estimate_query_bytes(sql: str) -> int:
+    """Bytes a query scans, from a BigQuery dry run (free, returns no rows)."""
+    job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+    return _get_client().query(sql, job_config=job_config).total_bytes_processed or 0
+
+
+async def _record_sql_bytes(usage: SessionUsage, sql: str) -> None:
+    try:
+        usage.bytes_scanned += await asyncio.to_thread(estimate_query_bytes, sql)
+    except Exception as e:
+        logger.debug(f"Could not estimate bytes scanned: {e}")
+
+
+def count_sql_tool_calls(tool, args, tool_context, tool_response) -> None:
+    """
+    after_tool_callback counting BigQueryToolset SQL executions as data queries.
+
+    execute_sql does not report bytes processed, so they are estimated with a dry
+    run of the same query in the background, without delaying the tool response.
+    """
+    if tool.name != "execute_sql":
+        return None
+    record_data_query()
+
+    usage = current_usage.get()
+    query = args.get("query")
+    failed = isinstance(tool_response, dict) and tool_response.get("status") == "ERROR"
+    if usage is not None and query and not failed:
+        task = asyncio.create_task(_record_sql_bytes(usage, query))
+        _sql_estimates.add(task)
+        task.add_done_callback(_sql_estimates.discard)
+    return None
@@ -11,6 +11,9 @@ from google.adk.tools.retrieval.vertex_ai_rag_retrieval import VertexAiRagRetrie
 from vertexai.preview import rag
 from vertexai.preview.rag import RagRetrievalConfig
 
+from ..usage import record_rag_retrieval
+from .rag_context import CHUNK_SEPARATOR, RAG_MAX_TOP_K, assemble_context, retrieve_adaptive
+
 logger = logging.getLogger(__name__)
 
 # RAG Corpus Configuration for NeuCard FAQ
@@ -19,9 +22,24 @@ LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION", os.getenv("LOCATION", "us-central1
 RAG_CORPUS_ID = os.getenv("RAG_CORPUS_ID", "4611686018427387904")  # NeuCard FAQ corpus
 CORPUS_NAME = f"projects/{PROJECT_ID}/locations/{LOCATION}/ragCorpora/{RAG_CORPUS_ID}"
 
+# Dedup, relevance cutoff and token budget on retrieved chunks (see rag_context.py)
+RAG_CONTEXT_ASSEMBLY = os.getenv("RAG_CONTEXT_ASSEMBLY", "false").lower() == "true"
+
 logger.info(f"📚 NeuCard FAQ RAG Corpus configured: {CORPUS_NAME}")
 
 
+def _retrieve_scored(query: str, top_k: int) -> list:
+    """(text, score) pairs for a query from the NeuCard FAQ corpus."""
+    response = rag.retrieval_query(
+        rag_resources=[rag.RagResource(rag_corpus=CORPUS_NAME)],
+        text=query,
+        rag_retrieval_config=RagRetrievalConfig(top_k=top_k),
+    )
+    if not response.contexts or not response.contexts.contexts:
+        return []
+    return [(ctx.text, getattr(ctx, "score", None)) for ctx in response.contexts.contexts]
+
+
 def retrieve_neucard_faq(query: str) -> dict:
     """
     Retrieve NeuCard FAQ and credit card information from RAG corpus.
@@ -41,23 +59,34 @@ def retrieve_neucard_faq(query: str) -> dict:
         }
     
     try:
-        # Query RAG corpus
-        response = rag.retrieval_query(
-            rag_resources=[rag.RagResource(rag_corpus=CORPUS_NAME)],
-            text=query,
-            rag_retrieval_config=RagRetrievalConfig(top_k=10),
-        )
+        # Query RAG corpus; with assembly on, top_k is chosen per query
+        if RAG_CONTEXT_ASSEMBLY:
+            scored_chunks = retrieve_adaptive(lambda top_k: _retrieve_scored(query, top_k))
+        else:
+            scored_chunks = _retrieve_scored(query, RAG_MAX_TOP_K)
         
-        if not response.contexts or not response.contexts.contexts:
+        if not scored_chunks:
             logger.warning(f"❌ No information found for query: {query}")
             return {
                 "found": False,
                 "error": f"No information found in NeuCard FAQ knowledge base for: '{query}'"
             }
         
-        # Combine all retrieved contexts
-        retrieved_texts = [ctx.text for ctx in response.contexts.contexts]
-        combined_info = "\n\n---\n\n".join(retrieved_texts)
+        if RAG_CONTEXT_ASSEMBLY:
+            # Drop the low-relevance tail and near-duplicates, then pack into the token budget
+            assembled = assemble_context(scored_chunks)
+            retrieved_texts = assembled.chunks
+            combined_info = assembled.text
+            logger.info(
+                f"🧩 Assembled {len(retrieved_texts)}/{assembled.retrieved} chunks "
+                f"(~{assembled.tokens} tokens, {assembled.duplicates} duplicates, "
+                f"{assembled.retrieved - assembled.relevant} low-relevance)"
+            )
+        else:
+            # Combine all retrieved contexts
+            retrieved_texts = [text for text, _ in scored_chunks]
+            combined_info = CHUNK_SEPARATOR.join(retrieved_texts)
+        record_rag_retrieval(len(retrieved_texts))
         
         logger.info(f"📄 Retrieved {len(retrieved_texts)} documents ({len(combined_info)} chars)")
         
@@ -0,0 +1,179 @@
+"""Token-budgeted context assembly for RAG retrieval results.
+
+Turns the scored chunks returned by the RAG corpus into the text handed to the
+rag_retrieval_agent:
+1. Orders chunks by relevance and drops the low-relevance tail
+2. Removes near-duplicate chunks (word shingles + MinHash)
+3. Packs the remaining chunks into a token budget
+
+retrieve_adaptive() picks top_k per query: it asks for RAG_MIN_TOP_K chunks and
+only widens to RAG_MAX_TOP_K when every one of them passes that query's tail
+cutoff, i.e. when relevant chunks were probably left behind.
+"""
+
+import os
+import random
+import re
+import zlib
+from typing import Callable, List, Optional, Sequence, Tuple
+
+# Assembly configuration
+RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "1500"))
+# Chunks whose estimated Jaccard similarity to a kept chunk reaches this are dropped
+RAG_DEDUP_THRESHOLD = float(os.getenv("RAG_DEDUP_THRESHOLD", "0.7"))
+# Keep chunks scoring within this fraction of the best chunk
+RAG_SCORE_TAIL_RATIO = float(os.getenv("RAG_SCORE_TAIL_RATIO", "0.35"))
+# Vertex AI RAG Engine returns cosine distance by default (lower is better)
+RAG_SCORE_IS_DISTANCE = os.getenv("RAG_SCORE_IS_DISTANCE", "true").lower() == "true"
+RAG_MIN_TOP_K = int(os.getenv("RAG_MIN_TOP_K", "4"))
+RAG_MAX_TOP_K = int(os.getenv("RAG_MAX_TOP_K", "10"))
+
+CHUNK_SEPARATOR = "\n\n---\n\n"
+_MIN_SCORE_MARGIN = 0.05
+
+_SHINGLE_SIZE = 5
+_NUM_PERMUTATIONS = 64
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(1234)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(_NUM_PERMUTATIONS)
+]
+_WORD_RE = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def minhash_signature(text: str) -> Tuple[int, ...]:
+    """MinHash signature of the word 5-shingles of a text."""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < _SHINGLE_SIZE:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + _SHINGLE_SIZE]) for i in range(len(words) - _SHINGLE_SIZE + 1)}
+    hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in shingles]
+    return tuple(min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def estimated_jaccard(sig_a: Sequence[int], sig_b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+def _relevant_tail(
+    chunks: List[Tuple[str, Optional[float]]], tail_ratio: float, score_is_distance: bool
+) -> List[Tuple[str, Optional[float]]]:
+    """Chunks in relevance order with the low-relevance tail removed.
+
+    Unscored chunks keep retrieval order and are all kept.
+    """
+    if not chunks or any(score is None for _, score in chunks):
+        return chunks
+    chunks = sorted(chunks, key=lambda c: c[1], reverse=not score_is_distance)
+    best = chunks[0][1]
+    margin = max(abs(best) * tail_ratio, _MIN_SCORE_MARGIN)
+    if score_is_distance:
+        return [c for c in chunks if c[1] <= best + margin]
+    return [c for c in chunks if c[1] >= best - margin]
+
+
+def retrieve_adaptive(
+    retrieve: Callable[[int], List[Tuple[str, Optional[float]]]],
+    min_k: int = RAG_MIN_TOP_K,
+    max_k: int = RAG_MAX_TOP_K,
+    tail_ratio: float = RAG_SCORE_TAIL_RATIO,
+    score_is_distance: bool = RAG_SCORE_IS_DISTANCE,
+) -> List[Tuple[str, Optional[float]]]:
+    """
+    Retrieve with a small top_k, widening only when this query needs more.
+
+    Args:
+        retrieve: Called with a top_k; returns (text, score) pairs
+        min_k: top_k of the first retrieval
+        max_k: top_k of the wider retrieval
+        tail_ratio: Tail cutoff used to judge the first retrieval
+        score_is_distance: True when lower scores are more relevant
+
+    Returns:
+        (text, score) pairs from the last retrieval made
+    """
+    scored_chunks = retrieve(min_k)
+    if max_k <= min_k or len(scored_chunks) < min_k:
+        # The corpus had nothing more to give
+        return scored_chunks
+    if len(_relevant_tail(list(scored_chunks), tail_ratio, score_is_distance)) < len(scored_chunks):
+        # The cutoff already dropped something, so the relevant set fits in min_k
+        return scored_chunks
+    return retrieve(max_k)
+
+
+class AssembledContext:
+    """Result of assemble_context()."""
+
+    def __init__(self, chunks: List[str], retrieved: int, relevant: int, duplicates: int, over_budget: int):
+        self.chunks = chunks
+        self.text = CHUNK_SEPARATOR.join(chunks)
+        self.tokens = estimate_tokens(self.text)
+        self.retrieved = retrieved
+        self.relevant = relevant
+        self.duplicates = duplicates
+        self.over_budget = over_budget
+
+
+def assemble_context(
+    scored_chunks: Sequence[Tuple[str, Optional[float]]],
+    token_budget: int = RAG_CONTEXT_TOKEN_BUDGET,
+    dedup_threshold: float = RAG_DEDUP_THRESHOLD,
+    tail_ratio: float = RAG_SCORE_TAIL_RATIO,
+    score_is_distance: bool = RAG_SCORE_IS_DISTANCE,
+) -> AssembledContext:
+    """
+    Build a deduplicated, relevance-filtered, token-budgeted context.
+
+    Args:
+        scored_chunks: (text, score) pairs as retrieved; score may be None
+        token_budget: Maximum estimated tokens of the assembled text
+        dedup_threshold: Estimated Jaccard similarity at which a chunk is a duplicate
+        tail_ratio: Keep chunks scoring within this fraction of the best score
+        score_is_distance: True when lower scores are more relevant
+
+    Returns:
+        AssembledContext with the kept chunks in relevance order
+    """
+    chunks = [(text, score) for text, score in scored_chunks if text and text.strip()]
+    retrieved = len(chunks)
+
+    # 1. Relevance order and tail cutoff (unscored chunks keep retrieval order)
+    chunks = _relevant_tail(chunks, tail_ratio, score_is_distance)
+    relevant = len(chunks)
+
+    # 2. Near-duplicate removal, keeping the more relevant copy
+    unique: List[str] = []
+    signatures: List[Tuple[int, ...]] = []
+    for text, _ in chunks:
+        signature = minhash_signature(text)
+        if any(estimated_jaccard(signature, kept) >= dedup_threshold for kept in signatures):
+            continue
+        unique.append(text)
+        signatures.append(signature)
+    duplicates = relevant - len(unique)
+
+    # 3. Greedy packing into the token budget, most relevant first
+    packed: List[str] = []
+    separator_tokens = estimate_tokens(CHUNK_SEPARATOR)
+    used = 0
+    for text in unique:
+        cost = estimate_tokens(text) + (separator_tokens if packed else 0)
+        if used + cost <= token_budget:
+            packed.append(text)
+            used += cost
+    if not packed and unique:
+        # Even the best chunk is too long: truncate it rather than return nothing
+        packed.append(unique[0][: token_budget * 4])
+    over_budget = len(unique) - len(packed)
+
+    return AssembledContext(packed, retrieved, relevant, duplicates, over_budget)
+
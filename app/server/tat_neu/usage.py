@@ -0,0 +1,152 @@
+"""Per-session resource accounting for Tata Neu Customer Care Assistant.
+
+main.py creates one SessionUsage per WebSocket session and binds it to the
+current_usage context variable. Tools and sub-agents run inside the same
+asyncio context as the session's run_live() loop, so they can record their
+own work (data queries, bytes scanned, RAG retrievals, cache lookups) without
+knowing which session they serve.
+"""
+
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+# Estimated unit costs (USD) used to rank sessions; override per deployment
+COST_AUDIO_IN_PER_MIN = float(os.getenv("COST_AUDIO_IN_PER_MIN", "0.0045"))
+COST_AUDIO_OUT_PER_MIN = float(os.getenv("COST_AUDIO_OUT_PER_MIN", "0.018"))
+COST_PER_SUB_AGENT_CALL = float(os.getenv("COST_PER_SUB_AGENT_CALL", "0.0005"))
+COST_PER_TB_SCANNED = float(os.getenv("COST_PER_TB_SCANNED", "6.25"))
+
+
+class SessionUsage:
+    """Counters for one live session."""
+
+    def __init__(self, user_id: str, session_id: str):
+        self.user_id = user_id
+        self.session_id = session_id
+        self.started_at = time.time()
+        self.ended_at: Optional[float] = None
+        self.response_mode = "audio"
+
+        # Audio and video
+        self.audio_in_bytes = 0
+        self.audio_in_seconds = 0.0
+        self.audio_out_bytes = 0
+        self.audio_out_seconds = 0.0
+        self.audio_out_wire_bytes = 0
+        self.video_frames = 0
+        self.text_messages = 0
+        self.text_out_chars = 0
+        self.turns = 0
+
+        # Idle parking of the model stream
+        self.parks = 0
+        self.parked_seconds = 0.0
+
+        # Sub-agents (AgentTool invocations)
+        self.sub_agent_calls: Dict[str, int] = {}
+        self.sub_agent_latency_ms: Dict[str, float] = {}
+        self._pending_calls: Dict[str, float] = {}
+
+        # Data access
+        self.data_queries = 0
+        self.bytes_scanned = 0
+        self.rag_retrievals = 0
+        self.rag_documents = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def record_audio_in(self, num_bytes: int, sample_rate: int) -> None:
+        self.audio_in_bytes += num_bytes
+        self.audio_in_seconds += num_bytes / (2 * sample_rate)
+
+    def record_audio_out(self, num_bytes: int, sample_rate: int) -> None:
+        self.audio_out_bytes += num_bytes
+        self.audio_out_seconds += num_bytes / (2 * sample_rate)
+
+    def start_sub_agent_call(self, call_id: str, name: str) -> None:
+        self.sub_agent_calls[name] = self.sub_agent_calls.get(name, 0) + 1
+        self._pending_calls[call_id or name] = time.monotonic()
+
+    def finish_sub_agent_call(self, call_id: str, name: str) -> None:
+        started = self._pending_calls.pop(call_id or name, None)
+        if started is not None:
+            elapsed_ms = (time.monotonic() - started) * 1000
+            self.sub_agent_latency_ms[name] = self.sub_agent_latency_ms.get(name, 0.0) + elapsed_ms
+
+    def has_pending_sub_agent_calls(self) -> bool:
+        return bool(self._pending_calls)
+
+    def estimated_cost_usd(self) -> float:
+        return (
+            self.audio_in_seconds / 60 * COST_AUDIO_IN_PER_MIN
+            + self.audio_out_seconds / 60 * COST_AUDIO_OUT_PER_MIN
+            + sum(self.sub_agent_calls.values()) * COST_PER_SUB_AGENT_CALL
+            + self.bytes_scanned / 1e12 * COST_PER_TB_SCANNED
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        """Aggregate the session into a flat, JSON-serializable record."""
+        ended_at = self.ended_at or time.time()
+        cache_lookups = self.cache_hits + self.cache_misses
+        return {
+            "user_id": self.user_id,
+            "session_id": self.session_id,
+            "started_at": self.started_at,
+            "response_mode": self.response_mode,
+            "duration_s": round(ended_at - self.started_at, 1),
+            "audio_in_s": round(self.audio_in_seconds, 1),
+            "audio_in_bytes": self.audio_in_bytes,
+            "audio_out_s": round(self.audio_out_seconds, 1),
+            "audio_out_bytes": self.audio_out_bytes,
+            "audio_out_wire_bytes": self.audio_out_wire_bytes,
+            "video_frames": self.video_frames,
+            "text_messages": self.text_messages,
+            "text_out_chars": self.text_out_chars,
+            "turns": self.turns,
+            "parks": self.parks,
+            "parked_s": round(self.parked_seconds, 1),
+            "sub_agent_calls": dict(self.sub_agent_calls),
+            "sub_agent_avg_latency_ms": {
+                name: round(self.sub_agent_latency_ms.get(name, 0.0) / count, 1)
+                for name, count in self.sub_agent_calls.items()
+            },
+            "data_queries": self.data_queries,
+            "bytes_scanned": self.bytes_scanned,
+            "rag_retrievals": self.rag_retrievals,
+            "rag_documents": self.rag_documents,
+            "cache_hit_rate": round(self.cache_hits / cache_lookups, 3) if cache_lookups else None,
+            "estimated_cost_usd": round(self.estimated_cost_usd(), 6),
+        }
+
+
+# Usage of the session whose run_live() loop is executing the current code
+current_usage: ContextVar[Optional[SessionUsage]] = ContextVar("current_usage", default=None)
+
+
+def record_data_query(bytes_scanned: int = 0) -> None:
+    """Count one data query against the current session."""
+    usage = current_usage.get()
+    if usage is not None:
+        usage.data_queries += 1
+        usage.bytes_scanned += bytes_scanned
+
+
+def record_rag_retrieval(document_count: int) -> None:
+    """Count one RAG retrieval against the current session."""
+    usage = current_usage.get()
+    if usage is not None:
+        usage.rag_retrievals += 1
+        usage.rag_documents += document_count
+
+
+def record_cache_lookup(hit: bool) -> None:
+    """Count one data cache lookup against the current session."""
+    usage = current_usage.get()
+    if usage is not None:
+        if hit:
+            usage.cache_hits += 1
+        else:
+            usage.cache_misses += 1
+
@@ -0,0 +1,89 @@
+"""Local store of per-session usage summaries.
+
+Completed session summaries (see tat_neu.usage.SessionUsage) are appended to a
+SQLite file for offline analysis and queried by the admin endpoint to list the
+most expensive sessions.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+from contextlib import closing
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+USAGE_DB_PATH = os.getenv("USAGE_DB_PATH", "session_usage.db")
+
+# Summary fields that can be used to rank sessions
+SORTABLE_FIELDS = (
+    "estimated_cost_usd",
+    "duration_s",
+    "audio_in_s",
+    "audio_out_s",
+    "audio_out_wire_bytes",
+    "bytes_scanned",
+    "data_queries",
+    "rag_retrievals",
+)
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS session_usage (
+    session_id TEXT,
+    user_id TEXT,
+    started_at REAL,
+    {", ".join(f"{field} REAL" for field in SORTABLE_FIELDS)},
+    summary TEXT
+)
+"""
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(USAGE_DB_PATH)
+    conn.execute(_SCHEMA)
+    return conn
+
+
+def _insert(summary: Dict[str, Any]) -> None:
+    columns = ["session_id", "user_id", "started_at", *SORTABLE_FIELDS, "summary"]
+    values = [summary.get(column) for column in columns[:-1]] + [json.dumps(summary)]
+    # The connection's own context manager only commits; closing() releases it
+    with closing(_connect()) as conn, conn:
+        conn.execute(
+            f"INSERT INTO session_usage ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            values,
+        )
+
+
+def _top(limit: int, order_by: str) -> List[Dict[str, Any]]:
+    with closing(_connect()) as conn:
+        rows = conn.execute(
+            f"SELECT summary FROM session_usage ORDER BY {order_by} DESC LIMIT ?", (limit,)
+        ).fetchall()
+    return [json.loads(row[0]) for row in rows]
+
+
+async def save_session_usage(summary: Dict[str, Any]) -> None:
+    """Append a session summary to the local store without blocking the event loop."""
+    try:
+        await asyncio.to_thread(_insert, summary)
+    except Exception as e:
+        logger.error(f"Error saving session usage: {e}")
+
+
+async def top_sessions(limit: int = 10, order_by: str = "estimated_cost_usd") -> List[Dict[str, Any]]:
+    """
+    Return the most expensive stored sessions.
+
+    Args:
+        limit: Number of sessions to return
+        order_by: One of SORTABLE_FIELDS
+
+    Returns:
+        List of session summaries, most expensive first
+    """
+    if order_by not in SORTABLE_FIELDS:
+        raise ValueError(f"Cannot sort by '{order_by}'. Use one of: {', '.join(SORTABLE_FIELDS)}")
+    return await asyncio.to_thread(_top, limit, order_by)